@@ -0,0 +1,132 @@
+"""Streaming strength audit of large password dumps.
+
+Passwords are read one per line in fixed-size chunks, scored by
+strength.evaluate_password (including pattern-aware guess estimates) in a
+process pool and written to a CSV or JSONL report in input order. Only a bounded number of chunks are in flight at any
+time, so memory use does not depend on the size of the input. The report
+never contains the passwords themselves, only their line numbers. Blank
+lines are skipped; the remaining entries keep their original line numbers.
+"""
+import csv
+import json
+import os
+import time
+from collections import Counter, deque
+
+from pattern_estimator import PatternEstimator
+from strength import evaluate_password
+from word_index import open_word_list
+
+REPORT_FIELDS = ("line", "length", "entropy", "guess_bits", "score", "strength", "meets_policy", "pwned",
+                 "suggestions")
+
+# Per-process scoring settings, installed by _init_audit_worker
+_settings = None
+
+
+def _init_audit_worker(threat, passphrase, wordlist, pwned_store):
+    global _settings
+    words = open_word_list(wordlist)
+    reject = None
+    if pwned_store:
+        from pwned_store import PwnedStore
+        reject = PwnedStore(pwned_store).is_pwned
+    _settings = (threat, passphrase, len(words), reject, PatternEstimator(words))
+
+
+def _audit_chunk(entries):
+    """Score one chunk of (line number, password); returns its report rows and histogram counts."""
+    threat, passphrase, word_list_size, reject, estimator = _settings
+    rows = []
+    stats = Counter()
+    for line, password in entries:
+        report = evaluate_password(password, threat, passphrase, word_list_size,
+                                   bool(reject and reject(password)), estimator)
+        rows.append((line, report.length, report.entropy, report.guess_bits, report.score, report.strength,
+                     report.meets_policy, report.pwned, " ".join(report.suggestions)))
+        stats[("strength", report.strength)] += 1
+        stats[("entropy_bits", int(report.entropy // 10) * 10)] += 1
+        stats[("guess_bits", int((report.guess_bits or 0) // 10) * 10)] += 1
+        stats[("length", min(report.length, 64))] += 1
+        stats[("meets_policy", report.meets_policy)] += 1
+        stats[("pwned", report.pwned)] += 1
+    return rows, stats
+
+
+def iter_chunks(lines, chunk_size):
+    """Chunks of (line number, password) with line endings removed and blank lines skipped."""
+    chunk = []
+    for number, line in enumerate(lines, 1):
+        password = line.rstrip("\r\n")
+        if not password:
+            continue
+        chunk.append((number, password))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _ReportWriter:
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == "csv":
+            self._csv = csv.writer(stream)
+            self._csv.writerow(REPORT_FIELDS)
+
+    def write(self, rows):
+        if self.fmt == "csv":
+            self._csv.writerows(rows)
+        else:
+            self.stream.write(''.join(json.dumps(dict(zip(REPORT_FIELDS, row))) + "\n" for row in rows))
+
+
+def run_audit(lines, report_stream, threat, fmt="csv", workers=None, chunk_size=10_000,
+              passphrase=False, wordlist="wordlist.txt", pwned_store=None, progress=None):
+    """Audit every password in lines and return the aggregate summary.
+
+    workers=1 scores in this process; otherwise a pool of that many processes
+    is used (None means every core). progress, if set, is called as
+    progress(done, elapsed) after each chunk.
+    """
+    import multiprocessing
+
+    settings = (threat, passphrase, wordlist, pwned_store)
+    # Open the word list and store here first: a failing pool initializer would respawn workers forever
+    _init_audit_worker(*settings)
+    writer = _ReportWriter(report_stream, fmt)
+    totals = Counter()
+    done = 0
+    started = time.perf_counter()
+    pending = deque()
+
+    def collect(rows, stats):
+        nonlocal done
+        writer.write(rows)
+        totals.update(stats)
+        done += len(rows)
+        if progress:
+            progress(done, time.perf_counter() - started)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in iter_chunks(lines, chunk_size):
+            collect(*_audit_chunk(chunk))
+    else:
+        with multiprocessing.Pool(workers, _init_audit_worker, settings) as pool:
+            for chunk in iter_chunks(lines, chunk_size):
+                pending.append(pool.apply_async(_audit_chunk, (chunk,)))
+                if len(pending) >= 2 * workers:
+                    collect(*pending.popleft().get())
+            while pending:
+                collect(*pending.popleft().get())
+
+    elapsed = time.perf_counter() - started
+    summary = {"passwords": done, "seconds": round(elapsed, 3),
+               "passwords_per_sec": round(done / elapsed) if elapsed > 0 else 0}
+    for name in ("strength", "entropy_bits", "guess_bits", "length", "meets_policy", "pwned"):
+        buckets = sorted((key, count) for (group, key), count in totals.items() if group == name)
+        summary[name] = {str(key): count for key, count in buckets}
+    return summary
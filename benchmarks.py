@@ -0,0 +1,324 @@
+"""Reproducible benchmarks for the generator's hot paths.
+
+Runs headless: the GUI class is built without Tk, with its variables and
+widgets replaced by plain stand-ins, so the same methods the buttons call
+are measured directly. The threat feed is pointed at a local stand-in for
+the HIBP endpoint and never touches the network.
+
+    python benchmarks.py -o results.json                   # run and save
+    python benchmarks.py --baseline baseline.json          # compare, exit 1 on regressions
+    python benchmarks.py -k generate --quick               # a subset, shorter runs
+
+Each result is the best of several timed runs, reported as microseconds per
+item (a password, a score, a load or a refresh) and items per second.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import replace
+from datetime import datetime
+
+import metrics
+import password_generator
+from loadtest import FakeHIBPServer, synthetic_breaches
+from history_store import open_history_log
+from password_engine import PasswordPolicy, generate_password, generate_password_batch, iter_passwords
+from password_generator import PasswordGenerator
+from strength import evaluate_password
+from threat_feed import ThreatFeed
+
+LENGTHS = (4, 8, 12, 16, 24, 32)
+EXCLUSION_SETS = {"none": "", "ambiguous": "lI1O0o", "no-vowels": "aeiouAEIOU", "shell-safe": "\"'`$\\!&|;<>"}
+BATCH_SIZE = 10_000
+SCORED_PASSWORDS = ("password", "Password123!", "qwertyuiop", "correct-Horse7-battery", "Tr0ub4dor&3",
+                    "1987-06-14", "aaaaaaaaaaaa", "zX8#qL2!vN5$wR9@", "abcdefghijk", "dragon2024")
+LARGE_BREACH_LIST = 50_000
+DEFAULT_TOLERANCE = 0.25
+
+
+class _Var:
+    """Stand-in for a Tk variable."""
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+    def trace_add(self, mode, callback):
+        pass
+
+
+class _Widget(dict):
+    """Stand-in for a label, progress bar or listbox."""
+
+    def __init__(self, **options):
+        super().__init__(options)
+        self.rows = []
+
+    def config(self, **options):
+        self.update(options)
+
+    configure = config
+
+    def cget(self, option):
+        return self.get(option, "")
+
+    def insert(self, index, value):
+        self.rows.insert(len(self.rows) if index == "end" else index, value)
+
+    def delete(self, first, last=None):
+        end = len(self.rows) - 1
+        first = end if first == "end" else first
+        last = first if last is None else end if last == "end" else last
+        del self.rows[first:last + 1]
+
+
+class _Messages:
+    """Stand-in for tkinter.messagebox; an error dialog during a benchmark is a failure."""
+
+    def showerror(self, title, message):
+        raise RuntimeError(message)
+
+    def showinfo(self, title, message):
+        pass
+
+    showwarning = showinfo
+
+
+def headless_app(wordlist="wordlist.txt", threat_feed=None):
+    """A PasswordGenerator with everything but Tk set up, as __init__ would."""
+    password_generator.messagebox = _Messages()
+    app = object.__new__(PasswordGenerator)
+    app.root = None
+    for name, value in (("length_var", 12), ("upper_var", True), ("lower_var", True), ("digits_var", True),
+                        ("symbols_var", True), ("random_var", True), ("passphrase_var", False),
+                        ("exclude_var", ""), ("wordlist_var", "default"), ("generated_password", ""),
+                        ("test_password", ""), ("threat_level", "Low"), ("threat_trend", "Stable")):
+        setattr(app, name, _Var(value))
+    app.password_history = password_generator.HistoryRing(10)
+    app.export_log_path, app.export_log = os.devnull, None
+    app.threat_feed = threat_feed or ThreatFeed(cache_file=os.devnull)
+    app.threat_snapshot = app.threat_feed.snapshot
+    app.word_list = app.load_word_list(wordlist)
+    app.word_index = password_generator.WordIndex(app.word_list)
+    app.word_lists = password_generator.discover_word_lists(wordlist)
+    app.estimator = password_generator.PatternEstimator(app.word_list)
+    app.pwned_store = None
+    app.ready, app.load_errors = True, []
+    for name in ("strength_bar", "strength_text", "entropy_label", "threat_feedback", "history_listbox",
+                 "live_estimate"):
+        setattr(app, name, _Widget())
+    return app
+
+
+def measure(fn, setup=None, items=1, repeat=3, min_time=0.2):
+    """Best-of-repeat time per item; only fn is timed, setup runs before every call."""
+    best = float("inf")
+    calls = 0
+    for _ in range(repeat):
+        elapsed = 0.0
+        n = 0
+        while elapsed < min_time or n < 2:
+            if setup:
+                setup()
+            started = time.perf_counter()
+            fn()
+            elapsed += time.perf_counter() - started
+            n += 1
+        calls += n
+        best = min(best, elapsed / n)
+    per_item = best / items
+    return {"us_per_item": round(per_item * 1e6, 3), "items_per_sec": round(1 / per_item, 1) if per_item else 0,
+            "calls": calls}
+
+
+class _HIBPThread:
+    """FakeHIBPServer on its own event loop thread, for synchronous callers."""
+
+    def __init__(self, breaches):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="FakeHIBP", daemon=True).start()
+        self.server = asyncio.run_coroutine_threadsafe(FakeHIBPServer(breaches).start(), self.loop).result()
+        self.url = self.server.url
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def bench_word_list(results, scratch, wordlist, options):
+    source = os.path.join(scratch, "wordlist.txt")
+    shutil.copyfile(wordlist, source)
+    app = headless_app(wordlist)
+
+    def drop_cache():
+        if os.path.exists(source + ".idx"):
+            os.remove(source + ".idx")
+
+    results["load_word_list/cold"] = measure(lambda: app.load_word_list(source), drop_cache, **options)
+    results["load_word_list/warm"] = measure(lambda: app.load_word_list(source), **options)
+
+
+def bench_generators(results, app, options, lengths):
+    snapshot = app.threat_snapshot
+    app.threat_snapshot = replace(snapshot, min_length=min(LENGTHS))  # let the short lengths through
+    for exclusions, exclude in EXCLUSION_SETS.items():
+        app.exclude_var.set(exclude)
+        for length in lengths:
+            app.length_var.set(length)
+            name = f"length={length},exclude={exclusions}"
+            results[f"generate_random_password/{name}"] = measure(app.generate_random_password, **options)
+            policy = app.current_policy()
+            results[f"generate_password_batch/{name}"] = measure(
+                lambda: generate_password_batch(policy, BATCH_SIZE), items=BATCH_SIZE, **options)
+        results[f"generate_passphrase/exclude={exclusions}"] = measure(app.generate_passphrase, **options)
+        policy = app.current_policy()
+        results[f"passphrase_batch/exclude={exclusions}"] = measure(
+            lambda: sum(1 for _ in iter_passwords(policy, 1_000, app.word_index)), items=1_000, **options)
+    app.exclude_var.set("")
+    app.length_var.set(12)
+    app.threat_snapshot = snapshot
+
+
+def bench_scoring(results, app, options):
+    def score_all(score):
+        for password in SCORED_PASSWORDS:
+            score(password)
+
+    def reset_feedback():
+        app.threat_feedback.config(text=app.threat_snapshot.context)
+
+    count = len(SCORED_PASSWORDS)
+    results["calculate_entropy"] = measure(lambda: score_all(app.calculate_entropy), items=count, **options)
+    results["update_strength_indicator"] = measure(lambda: score_all(app.update_strength_indicator),
+                                                   reset_feedback, items=count, **options)
+    app.passphrase_var.set(True)
+    results["update_strength_indicator/passphrase"] = measure(lambda: score_all(app.update_strength_indicator),
+                                                              reset_feedback, items=count, **options)
+    app.passphrase_var.set(False)
+
+
+def bench_history(results, app, scratch, options):
+    results["update_history"] = measure(lambda: app.update_history("zX8#qL2!vN5$wR9@"), **options)
+    with open_history_log(os.path.join(scratch, "export.log")) as log:
+        results["export_log/append"] = measure(lambda: log.extend(["zX8#qL2!vN5$wR9@"] * 1_000), items=1_000,
+                                               **options)
+        results["export_log/range_query"] = measure(
+            lambda: sum(1 for _ in log.entries(log.last_timestamp)), **options)
+
+
+def bench_threat(results, app, scratch, options, large_breaches):
+    results["update_threat_level"] = measure(app.update_threat_level, **options)
+
+    for label, count in (("", 1_000), ("/large", large_breaches)):
+        hibp = _HIBPThread(synthetic_breaches(count))
+        cache_file = os.path.join(scratch, f"threat_cache{label.replace('/', '_')}.json")
+        try:
+            def miss():
+                ThreatFeed(cache_file=cache_file, url=hibp.url).refresh()
+
+            def drop_cache():
+                if os.path.exists(cache_file):
+                    os.remove(cache_file)
+
+            results[f"threat_refresh/cache_miss{label}"] = measure(miss, drop_cache, **options)
+            ThreatFeed(cache_file=cache_file, url=hibp.url).refresh()  # leave a fresh cache behind
+            results[f"threat_refresh/cache_hit{label}"] = measure(
+                lambda: ThreatFeed(cache_file=cache_file, url=hibp.url).refresh(), **options)
+        finally:
+            hibp.close()
+
+
+def bench_metrics(results, app, options):
+    """Instrumented calls with metrics off and on; "off" should match an uninstrumented build."""
+    policy = PasswordPolicy(length=16)
+    was_enabled = metrics.enabled
+    try:
+        for label, enable in (("off", metrics.disable), ("on", metrics.enable)):
+            enable()
+            results[f"metrics_{label}/generate_password"] = measure(lambda: generate_password(policy), **options)
+            results[f"metrics_{label}/evaluate_password"] = measure(
+                lambda: evaluate_password("zX8#qL2!vN5$wR9@", app.threat_snapshot, estimator=app.estimator),
+                **options)
+    finally:
+        metrics.enable() if was_enabled else metrics.disable()
+        metrics.METRICS.reset()
+
+
+def run_benchmarks(wordlist="wordlist.txt", pattern="", quick=False):
+    options = {"repeat": 2, "min_time": 0.05} if quick else {"repeat": 3, "min_time": 0.2}
+    lengths = (8, 16, 32) if quick else LENGTHS
+    large_breaches = LARGE_BREACH_LIST // 10 if quick else LARGE_BREACH_LIST
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        app = headless_app(wordlist, ThreatFeed(cache_file=os.path.join(scratch, "app_cache.json")))
+        suites = (("load_word_list", lambda: bench_word_list(results, scratch, wordlist, options)),
+                  ("generate", lambda: bench_generators(results, app, options, lengths)),
+                  ("scoring", lambda: bench_scoring(results, app, options)),
+                  ("history", lambda: bench_history(results, app, scratch, options)),
+                  ("threat", lambda: bench_threat(results, app, scratch, options, large_breaches)),
+                  ("metrics", lambda: bench_metrics(results, app, options)))
+        for name, suite in suites:
+            if pattern in name:
+                suite()
+    return {"timestamp": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "platform": platform.platform(), "quick": quick, "results": results}
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """(name, baseline us, current us, ratio, regressed) for every benchmark in both runs."""
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before and before["us_per_item"]:
+            ratio = result["us_per_item"] / before["us_per_item"]
+            rows.append((name, before["us_per_item"], result["us_per_item"], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the password generator's hot paths")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results saved by an earlier run")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Slowdown allowed before a benchmark counts as a regression (0.25 = 25%%)")
+    parser.add_argument("-k", "--suite", default="",
+                        help="Only run suites whose name contains this (load_word_list, generate, scoring, history, threat, metrics)")
+    parser.add_argument("--quick", action="store_true", help="Fewer cases and shorter runs")
+    parser.add_argument("--wordlist", default="wordlist.txt", help="Word list to benchmark with")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.wordlist, args.suite, args.quick)
+    for name, result in current["results"].items():
+        print(f"{name:<58} {result['us_per_item']:>12,.3f} us {result['items_per_sec']:>14,.0f}/s")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(current, file, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, 'r') as file:
+        baseline = json.load(file)
+    regressions = 0
+    print(f"\nCompared with {args.baseline} ({baseline.get('timestamp', 'unknown')}):")
+    for name, before, after, ratio, regressed in compare(current, baseline, args.tolerance):
+        regressions += regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<58} {before:>12,.3f} -> {after:>12,.3f} us ({ratio:5.2f}x){flag}")
+    print(f"{regressions} regression(s) beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
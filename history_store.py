@@ -0,0 +1,331 @@
+"""Password history and the encrypted export log.
+
+HistoryRing keeps the last few passwords for the GUI list in a fixed-size
+ring, and reports which entry fell off so the list box only has to change
+the rows that moved.
+
+EncryptedLog replaces the plaintext passwords.txt export. Each entry is one
+authenticated-encrypted frame appended to the file:
+
+    length (4) | timestamp (8) | sequence (8) | nonce (12) | ciphertext + tag
+
+The timestamp and sequence number are authenticated as associated data, so
+frames cannot be edited, reordered or dropped from the middle unnoticed.
+Frames are encrypted with AES-256-GCM when the optional `cryptography`
+package is installed, otherwise with an encrypt-then-MAC construction built
+from HMAC-SHA256; the header records which one a file uses. Writes are
+buffered and fsync'd in batches, and a sparse timestamp index (one entry per
+INDEX_STRIDE frames) answers range queries with a bisect and a short scan,
+so memory stays small however many entries the log holds.
+"""
+import hmac
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass
+
+from optional import optional_import
+
+# cryptography is optional and only imported when a log is opened; without it logs use HMAC-SHA256
+AEAD_MODULE = "cryptography.hazmat.primitives.ciphers.aead"
+
+LOG_MAGIC = b"APGHLOG1"
+LOG_HEADER = struct.Struct("<8sB8s")  # magic, algorithm, key check
+FRAME_LENGTH = struct.Struct("<I")
+FRAME_AAD = struct.Struct("<dQ")  # timestamp, sequence number
+NONCE_SIZE = 12
+TAG_SIZE = 16
+KEY_SIZE = 32
+INDEX_STRIDE = 256
+
+ALGORITHM_AES_GCM = 1
+ALGORITHM_HMAC_SHA256 = 2
+
+
+@dataclass(frozen=True)
+class HistoryEntry:
+    timestamp: float
+    sequence: int
+    password: str
+
+
+class HistoryRing:
+    """The most recent passwords, newest first, capped at capacity."""
+
+    def __init__(self, capacity=10):
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        self.capacity = capacity
+        self._entries = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return reversed(self._entries)
+
+    def append(self, password):
+        """Add a password; returns the entry pushed out of the ring, or None."""
+        evicted = self._entries[0] if len(self._entries) == self.capacity else None
+        self._entries.append(password)
+        return evicted
+
+    def clear(self):
+        self._entries.clear()
+
+
+def _derive(key, purpose):
+    return hmac.digest(key, purpose, 'sha256')
+
+
+class _HMACSHA256:
+    """Encrypt-then-MAC from the standard library.
+
+    The keystream is HMAC-SHA256(nonce || block counter) and the tag is
+    HMAC-SHA256 over the associated data, nonce and ciphertext, truncated to
+    16 bytes. Encryption and authentication use separate derived keys.
+    """
+
+    def __init__(self, key):
+        self._encrypt_key = _derive(key, b"history encrypt")
+        self._mac_key = _derive(key, b"history authenticate")
+
+    def _xor(self, nonce, data):
+        blocks = (len(data) + 31) // 32
+        stream = b''.join(hmac.digest(self._encrypt_key, nonce + i.to_bytes(4, 'big'), 'sha256')
+                          for i in range(blocks))
+        return (int.from_bytes(data, 'big') ^ int.from_bytes(stream[:len(data)], 'big')).to_bytes(len(data), 'big')
+
+    def encrypt(self, nonce, data, aad):
+        body = self._xor(nonce, data)
+        return body + hmac.digest(self._mac_key, aad + nonce + body, 'sha256')[:TAG_SIZE]
+
+    def decrypt(self, nonce, data, aad):
+        body, tag = data[:-TAG_SIZE], data[-TAG_SIZE:]
+        if not hmac.compare_digest(tag, hmac.digest(self._mac_key, aad + nonce + body, 'sha256')[:TAG_SIZE]):
+            raise ValueError("History entry failed authentication")
+        return self._xor(nonce, body)
+
+
+class _AESGCM:
+    def __init__(self, key):
+        self._aead = optional_import(AEAD_MODULE).AESGCM(_derive(key, b"history aes-256-gcm"))
+
+    def encrypt(self, nonce, data, aad):
+        return self._aead.encrypt(nonce, data, aad)
+
+    def decrypt(self, nonce, data, aad):
+        try:
+            return self._aead.decrypt(nonce, data, aad)
+        except optional_import("cryptography.exceptions").InvalidTag:
+            raise ValueError("History entry failed authentication")
+
+
+def _cipher(algorithm, key):
+    if algorithm == ALGORITHM_AES_GCM:
+        if optional_import(AEAD_MODULE) is None:
+            raise ValueError("This history log uses AES-GCM; install the 'cryptography' package to read it")
+        return _AESGCM(key)
+    if algorithm == ALGORITHM_HMAC_SHA256:
+        return _HMACSHA256(key)
+    raise ValueError(f"Unknown history log algorithm {algorithm}")
+
+
+def load_key(path, create=False):
+    """Read the 32-byte log key at path; with create, a missing key is generated (mode 0600)."""
+    if not create:
+        try:
+            with open(path, 'rb') as file:
+                key = file.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No history key at '{path}'") from None
+        if len(key) != KEY_SIZE:
+            raise ValueError(f"'{path}' is not a {KEY_SIZE}-byte history key")
+        return key
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, 'rb') as file:
+            key = file.read()
+        if len(key) != KEY_SIZE:
+            raise ValueError(f"'{path}' is not a {KEY_SIZE}-byte history key")
+        return key
+    key = os.urandom(KEY_SIZE)
+    with os.fdopen(fd, 'wb') as file:
+        file.write(key)
+    return key
+
+
+class EncryptedLog:
+    """Append-only, authenticated-encrypted password log with a timestamp index.
+
+    Entries are buffered in memory and written once buffer_size bytes are
+    pending; the file is fsync'd after sync_every entries or sync_interval
+    seconds, whichever comes first, and on sync() or close().
+    """
+
+    def __init__(self, path, key, sync_every=10_000, sync_interval=1.0, buffer_size=1 << 16):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.buffer_size = buffer_size
+        self.count = 0
+        self.last_timestamp = 0.0
+        self._index_timestamps = array('d')
+        self._index_offsets = array('Q')
+        key_check = _derive(key, b"history key check")[:8]
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            algorithm = self._load(key_check)
+        else:
+            algorithm = ALGORITHM_AES_GCM if optional_import(AEAD_MODULE) is not None else ALGORITHM_HMAC_SHA256
+            with open(path, 'wb') as file:
+                file.write(LOG_HEADER.pack(LOG_MAGIC, algorithm, key_check))
+        self._cipher = _cipher(algorithm, key)
+        self._file = open(path, 'ab')
+        self._end = self._file.tell()
+        self._buffer = bytearray()
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def _load(self, key_check):
+        """Index an existing log, dropping a final frame torn by a crash mid-write."""
+        with open(self.path, 'r+b') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                magic, algorithm, check = LOG_HEADER.unpack_from(data)
+                if magic != LOG_MAGIC:
+                    raise ValueError(f"'{self.path}' is not a password history log")
+                if not hmac.compare_digest(check, key_check):
+                    raise ValueError(f"Wrong key for '{self.path}'")
+                size = len(data)
+                position = LOG_HEADER.size
+                while position + FRAME_LENGTH.size + FRAME_AAD.size <= size:
+                    length, = FRAME_LENGTH.unpack_from(data, position)
+                    timestamp, sequence = FRAME_AAD.unpack_from(data, position + FRAME_LENGTH.size)
+                    end = position + FRAME_LENGTH.size + FRAME_AAD.size + length
+                    if end > size:
+                        break
+                    if sequence != self.count:
+                        raise ValueError(f"'{self.path}' is missing entries before #{sequence}")
+                    self._index(timestamp, position)
+                    self.last_timestamp = timestamp
+                    position = end
+            if position < size:
+                file.truncate(position)
+        return algorithm
+
+    def _index(self, timestamp, offset):
+        if self.count % INDEX_STRIDE == 0:
+            self._index_timestamps.append(timestamp)
+            self._index_offsets.append(offset)
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, password, timestamp=None):
+        """Encrypt and buffer one entry; timestamps never go backwards within a log."""
+        timestamp = max(timestamp or time.time(), self.last_timestamp)
+        aad = FRAME_AAD.pack(timestamp, self.count)
+        nonce = os.urandom(NONCE_SIZE)
+        sealed = self._cipher.encrypt(nonce, password.encode('utf-8'), aad)
+        self._index(timestamp, self._end + len(self._buffer))
+        self._buffer += FRAME_LENGTH.pack(NONCE_SIZE + len(sealed)) + aad + nonce + sealed
+        self.last_timestamp = timestamp
+        self._unsynced += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+        if self._unsynced >= self.sync_every or time.monotonic() - self._synced_at >= self.sync_interval:
+            self.sync()
+
+    def extend(self, passwords):
+        for password in passwords:
+            self.append(password)
+
+    def flush(self):
+        """Hand buffered entries to the OS without waiting for the disk."""
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._end += len(self._buffer)
+            self._buffer.clear()
+
+    def sync(self):
+        """Flush and fsync, making every entry so far durable."""
+        self.flush()
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def entries(self, start=None, end=None):
+        """Yield HistoryEntry objects with start <= timestamp <= end, oldest first."""
+        self.flush()
+        block = 0
+        if start is not None:
+            block = max(bisect_left(self._index_timestamps, start) - 1, 0)
+        if not self._index_offsets:
+            return
+        header_size = FRAME_LENGTH.size + FRAME_AAD.size
+        with open(self.path, 'rb') as file:
+            file.seek(self._index_offsets[block])
+            while True:
+                header = file.read(header_size)
+                if len(header) < header_size:
+                    return
+                length, = FRAME_LENGTH.unpack_from(header)
+                timestamp, sequence = FRAME_AAD.unpack_from(header, FRAME_LENGTH.size)
+                if end is not None and timestamp > end:
+                    return
+                if start is not None and timestamp < start:
+                    file.seek(length, os.SEEK_CUR)
+                    continue
+                body = file.read(length)
+                password = self._cipher.decrypt(body[:NONCE_SIZE], body[NONCE_SIZE:], header[FRAME_LENGTH.size:])
+                yield HistoryEntry(timestamp, sequence, password.decode('utf-8'))
+
+    def __iter__(self):
+        return self.entries()
+
+
+class LogWriter:
+    """Text-stream adapter for EncryptedLog: every complete line written becomes one entry."""
+
+    def __init__(self, log):
+        self.log = log
+        self._partial = ""
+
+    def write(self, text):
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        self.log.extend(lines)
+        return len(text)
+
+    def flush(self):
+        self.log.flush()
+
+
+def open_history_log(path, key_path=None, **options):
+    """Open (or create) the log at path with the key at key_path, "<path>.key" by default.
+
+    A missing key is only generated for a new log; an existing log whose key
+    is missing raises FileNotFoundError rather than being paired with a new
+    key that cannot read it.
+    """
+    new_log = not (os.path.exists(path) and os.path.getsize(path) > 0)
+    return EncryptedLog(path, load_key(key_path or f"{path}.key", create=new_log), **options)
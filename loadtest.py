@@ -0,0 +1,133 @@
+"""Load-test harness for the local generation service.
+
+Starts a stand-in for the HIBP breaches endpoint and an in-process
+GenerationService pointed at it, then drives the service from many
+keep-alive connections and reports requests/sec with p50/p99 latency.
+Nothing leaves the machine.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from service import GenerationService
+from threat_feed import ThreatFeed
+
+DATA_CLASSES = (["Email addresses", "Passwords"], ["Email addresses", "Usernames"], ["Passwords"],
+                ["Names", "Phone numbers"])
+
+
+def synthetic_breaches(count, today=None):
+    """HIBP-shaped breach records spread over the last few years, a few of them today."""
+    today = today or date.today()
+    return [{"Name": f"Breach{i}",
+             "BreachDate": (today - timedelta(days=(i * 7919) % 1500 if i % 50 else 0)).isoformat(),
+             "ModifiedDate": "2024-01-01T00:00:00Z",
+             "PwnCount": 1_000 + (i * 104_729) % 5_000_000,
+             "DataClasses": DATA_CLASSES[i % len(DATA_CLASSES)]}
+            for i in range(count)]
+
+
+class FakeHIBPServer:
+    """Serves a fixed breach list as JSON for any GET, like /api/v3/breaches."""
+
+    def __init__(self, breaches):
+        self.body = json.dumps(breaches).encode('utf-8')
+        self.requests = 0
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self
+
+    @property
+    def url(self):
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/api/v3/breaches"
+
+    async def _handle(self, reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            self.requests += 1
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(self.body) + self.body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.server.close()
+
+
+def _request_bytes(endpoint):
+    if endpoint.startswith("/score"):
+        body = json.dumps({"password": "correct-Horse7-battery"}).encode('utf-8')
+        return (b"POST /score HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n" % len(body) + body)
+    return f"GET {endpoint} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode('latin-1')
+
+
+async def _client(open_connection, request, count, latencies):
+    reader, writer = await open_connection()
+    try:
+        for _ in range(count):
+            started = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            if not head.startswith(b"HTTP/1.1 200"):
+                raise RuntimeError(head.split(b"\r\n", 1)[0].decode('latin-1'))
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_load_test(requests=10_000, concurrency=50, endpoint="/generate?length=16",
+                        wordlist="wordlist.txt", breaches=1_000, unix_socket=None):
+    """Run the load test and return its results as a dict (latencies in ms)."""
+    hibp = await FakeHIBPServer(synthetic_breaches(breaches)).start()
+    with tempfile.TemporaryDirectory() as scratch:
+        feed = ThreatFeed(cache_file=os.path.join(scratch, "threat_cache.json"), url=hibp.url)
+        service = GenerationService(wordlist, feed)
+        if unix_socket:
+            server = await service.start(unix_socket=unix_socket)
+            open_connection = lambda: asyncio.open_unix_connection(unix_socket)
+        else:
+            server = await service.start(port=0)
+            host, port = server.sockets[0].getsockname()[:2]
+            open_connection = lambda: asyncio.open_connection(host, port)
+        try:
+            while not feed.snapshot.fetched_at and not feed.snapshot.error:
+                await asyncio.sleep(0.01)  # let the first threat refresh land
+            latencies = []
+            request = _request_bytes(endpoint)
+            per_client, extra = divmod(requests, concurrency)
+            started = time.perf_counter()
+            await asyncio.gather(*(_client(open_connection, request, per_client + (i < extra), latencies)
+                                   for i in range(concurrency)))
+            elapsed = time.perf_counter() - started
+        finally:
+            server.close()
+            await server.wait_closed()
+            feed.stop()
+            hibp.close()
+
+    latencies.sort()
+    return {"endpoint": endpoint, "requests": len(latencies), "concurrency": concurrency,
+            "seconds": round(elapsed, 3), "requests_per_sec": round(len(latencies) / elapsed),
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+            "batch_draws": service.batcher.batches, "threat_level": feed.snapshot.level,
+            "hibp_requests": hibp.requests}
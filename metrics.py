@@ -0,0 +1,219 @@
+"""Counters, latency histograms and profiling hooks for the hot paths.
+
+Instrumented functions are wrapped with @timed(name) and record a latency
+histogram while metrics are enabled; counters such as CSPRNG bytes drawn
+and threat cache hits/misses are bumped with count(). Everything is off by
+default and then costs one flag check per call. Turn it on with enable(),
+the --metrics option of the batch commands and the service, or by setting
+APG_METRICS=<file> (the GUI writes its snapshot there on exit).
+
+The registry exports as Prometheus text (prometheus()) or a JSON snapshot
+(snapshot()). Only the current process is counted: worker processes of
+sharded generation and audits keep their own, unexported registries.
+"""
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# Upper bounds of the latency buckets, in seconds; anything slower lands in +Inf
+LATENCY_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+PROMETHEUS_PREFIX = "apg_"
+
+enabled = bool(os.environ.get("APG_METRICS"))
+
+
+class Histogram:
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs, ending with +Inf."""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class Metrics:
+    """Named counters and latency histograms, safe to update from several threads."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """Everything recorded so far as a JSON-serialisable dict."""
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {name: {"count": h.count, "sum_seconds": h.sum,
+                                 "mean_us": h.sum / h.count * 1e6 if h.count else 0.0,
+                                 "buckets": {_bound_label(bound): total for bound, total in h.cumulative()}}
+                          for name, h in self.histograms.items()}
+        hit_rates = {}
+        for name in counters:
+            for suffix in ("_hits", "_misses"):
+                if name.endswith(suffix):
+                    base = name[:-len(suffix)]
+                    hits, misses = counters.get(f"{base}_hits", 0), counters.get(f"{base}_misses", 0)
+                    hit_rates[base] = hits / (hits + misses)
+        return {"timestamp": time.time(), "counters": counters, "hit_rates": hit_rates, "latency": histograms}
+
+    def prometheus(self):
+        """The registry in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric = f"{PROMETHEUS_PREFIX}{name}_total"
+                lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+            for name, histogram in sorted(self.histograms.items()):
+                metric = f"{PROMETHEUS_PREFIX}{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for bound, total in histogram.cumulative():
+                    lines.append(f'{metric}_bucket{{le="{_bound_label(bound)}"}} {total}')
+                lines += [f"{metric}_sum {histogram.sum!r}", f"{metric}_count {histogram.count}"]
+        return "\n".join(lines) + "\n"
+
+
+def _bound_label(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+METRICS = Metrics()
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def count(name, amount=1):
+    """Add to a counter while metrics are enabled."""
+    if enabled:
+        METRICS.count(name, amount)
+
+
+def timed(name):
+    """Decorator recording each call's latency (and failures as <name>_errors) under name."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                METRICS.count(f"{name}_errors")
+                raise
+            finally:
+                METRICS.observe(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def _timer(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe(name, time.perf_counter() - started)
+
+
+def timer(name):
+    """Context manager form of timed() for a block inside a function."""
+    return _timer(name) if enabled else nullcontext()
+
+
+class CountingSystemRandom(random.SystemRandom):
+    """SystemRandom that adds every byte it draws from os.urandom to the csprng_bytes counter."""
+
+    def random(self):
+        METRICS.count("csprng_bytes", 7)
+        return super().random()
+
+    def getrandbits(self, k):
+        METRICS.count("csprng_bytes", (k + 7) // 8)
+        return super().getrandbits(k)
+
+    def randbytes(self, n):
+        METRICS.count("csprng_bytes", n)
+        return super().randbytes(n)
+
+
+def render(fmt="json"):
+    """The registry as Prometheus text ("prometheus") or an indented JSON snapshot ("json")."""
+    if fmt == "prometheus":
+        return METRICS.prometheus()
+    return json.dumps(METRICS.snapshot(), indent=2) + "\n"
+
+
+def write_metrics(path, fmt="json"):
+    """Write the registry to path, or to stderr when path is "-"."""
+    if path == "-":
+        sys.stderr.write(render(fmt))
+        return
+    with open(path, 'w') as file:
+        file.write(render(fmt))
+
+
+@contextmanager
+def profiled(path=None, sort="cumulative", limit=25):
+    """Run the block under cProfile and print the top functions to stderr.
+
+    With a path the raw statistics are also saved there for pstats or
+    snakeviz.
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats(sort).print_stats(limit)
+        sys.stderr.write(report.getvalue())
@@ -0,0 +1,18 @@
+"""Optional dependencies, imported on first use.
+
+NumPy (batch generation, word pool counts) and cryptography (AES-GCM for the
+export log) speed things up or strengthen them when installed, but every
+feature has a pure-Python fallback. They are imported the first time they
+are needed rather than at start-up, and each import is attempted only once.
+"""
+import importlib
+from functools import cache
+
+
+@cache
+def optional_import(name):
+    """The module called name, imported on first use; None if it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
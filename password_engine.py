@@ -0,0 +1,483 @@
+"""Headless password and passphrase generation.
+
+Both the Tkinter app and the command line entry point describe what they want
+with a PasswordPolicy and hand it to the functions below, so credentials can
+be produced without a display. A policy is immutable and hashable; the first
+time it is used it is compiled into a GenerationPlan (alphabets, required-slot
+layout, sampling tables, passphrase separators) that is cached and shared by
+every later call and thread.
+"""
+import json
+import os
+import random
+import string
+import time
+from collections import deque
+from dataclasses import dataclass, fields, replace
+from functools import lru_cache
+
+import metrics
+from optional import optional_import
+
+PASSPHRASE_DIGIT_SEPARATORS = "1234567890"
+PASSPHRASE_SYMBOL_SEPARATORS = "!@#$%^&*"
+
+# Regeneration rounds allowed when a reject check (e.g. the Pwned Passwords store) keeps hitting
+MAX_REJECTED_ROUNDS = 100
+
+# Cryptographically secure source, shared by every generator in this module
+_rng = random.SystemRandom()
+_counting_rng = metrics.CountingSystemRandom()  # used instead while metrics are enabled
+
+
+def _urandom(n):
+    if metrics.enabled:
+        metrics.METRICS.count("csprng_bytes", n)
+    return os.urandom(n)
+
+
+@dataclass(frozen=True)
+class PasswordPolicy:
+    """Everything needed to produce one password or passphrase.
+
+    Class minimums only apply to enabled classes. separators=None picks
+    passphrase separators from the enabled digits/symbols; threat_level
+    records the threat tier whose minimums were applied by with_threat.
+    """
+    length: int = 12
+    upper: bool = True
+    lower: bool = True
+    digits: bool = True
+    symbols: bool = True
+    shuffle: bool = True
+    exclude: str = ""
+    min_symbols: int = 0
+    min_words: int = 3
+    min_upper: int = 1
+    min_lower: int = 1
+    min_digits: int = 1
+    separators: str = None
+    threat_level: str = ""
+
+    def with_threat(self, threat):
+        """This policy raised to a ThreatSnapshot's minimums and tagged with its level."""
+        return _with_threat(self, threat.level, threat.min_length, threat.min_symbols, threat.min_words)
+
+
+@lru_cache(maxsize=256)
+def _with_threat(policy, level, min_length, min_symbols, min_words):
+    return replace(policy, length=max(policy.length, min_length), min_symbols=max(policy.min_symbols, min_symbols),
+                   min_words=max(policy.min_words, min_words), threat_level=level)
+
+
+def policy_from_dict(values, name="policy", base=PasswordPolicy()):
+    """base with the fields in values replaced, checking names and types."""
+    types = {field.name: field.type for field in fields(PasswordPolicy)}
+    for key, value in values.items():
+        expected = types.get(key)
+        if expected is None:
+            raise ValueError(f"Unknown policy field '{key}' in '{name}'")
+        if value is None and key == "separators":
+            continue
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            raise ValueError(f"Policy field '{key}' in '{name}' must be {expected.__name__}")
+    return replace(base, **values)
+
+
+def load_policies(filename):
+    """Named policies (e.g. one per tenant) from a JSON file.
+
+    The file maps names to policy fields; an optional "defaults" entry is
+    applied first to every other policy:
+
+        {"defaults": {"length": 16, "exclude": "0OIl"},
+         "acme": {"min_symbols": 2}, "globex": {"length": 24, "symbols": false}}
+    """
+    with open(filename, 'r') as file:
+        config = json.load(file)
+    if not isinstance(config, dict) or not all(isinstance(v, dict) for v in config.values()):
+        raise ValueError(f"'{filename}' must map policy names to objects of policy fields")
+    base = policy_from_dict(config.pop("defaults", {}), "defaults")
+    return {name: policy_from_dict(values, name, base) for name, values in config.items()}
+
+
+@dataclass(frozen=True, eq=False)
+class GenerationPlan:
+    """A PasswordPolicy compiled for generation; build with compile_policy."""
+    policy: PasswordPolicy
+    excluded: frozenset
+    characters: str   # every allowed character, exclusions removed
+    required: tuple   # alphabet of each required slot
+    fill: int         # slots drawn from characters
+    runs: tuple       # (alphabet, width) of consecutive slots sharing an alphabet
+    tables: dict      # alphabet -> (translate table, rejected bytes) for os.urandom sampling
+    num_words: int
+    capitalized: int  # passphrase words to capitalise
+    separators: str   # passphrase separators left after exclusions
+
+
+def _byte_table(pool):
+    """Translation table mapping a random byte onto pool, rejecting biased bytes."""
+    size = len(pool)
+    limit = 256 - 256 % size  # bytes >= limit would favour the start of the pool
+    table = bytes(ord(pool[b % size]) if b < limit else 0 for b in range(256))
+    return table, bytes(range(limit, 256))
+
+
+@lru_cache(maxsize=256)
+def compile_policy(policy):
+    """Compile (once per distinct policy) the plan every generator works from."""
+    exclude = frozenset(policy.exclude)
+
+    def allowed(chars, enabled):
+        return ''.join(c for c in chars if c not in exclude) if enabled else ""
+
+    upper = allowed(string.ascii_uppercase, policy.upper)
+    lower = allowed(string.ascii_lowercase, policy.lower)
+    digits = allowed(string.digits, policy.digits)
+    symbols = allowed(string.punctuation, policy.symbols)
+    characters = upper + lower + digits + symbols
+
+    required = []
+    for pool, minimum in ((symbols, policy.min_symbols), (upper, policy.min_upper),
+                          (lower, policy.min_lower), (digits, policy.min_digits)):
+        if pool and minimum > 0:
+            required.extend([pool] * minimum)
+    fill = max(0, policy.length - len(required))
+
+    runs = []
+    for pool, width in [(pool, 1) for pool in required] + ([(characters, fill)] if fill and characters else []):
+        if runs and runs[-1][0] == pool:
+            runs[-1] = (pool, runs[-1][1] + width)
+        else:
+            runs.append((pool, width))
+
+    if policy.separators is None:
+        separators = ((PASSPHRASE_DIGIT_SEPARATORS if policy.digits else "")
+                      + (PASSPHRASE_SYMBOL_SEPARATORS if policy.symbols else ""))
+    else:
+        separators = policy.separators
+    separators = ''.join(c for c in separators if c not in exclude) or ("-" if "-" not in exclude else "")
+
+    num_words = max(policy.min_words, min(policy.length // 4, 6))
+    capitalized = 0
+    if policy.upper and not exclude.issuperset(string.ascii_uppercase):
+        capitalized = min(2, num_words)
+
+    return GenerationPlan(policy=policy, excluded=exclude, characters=characters, required=tuple(required),
+                          fill=fill, runs=tuple(runs), tables={pool: _byte_table(pool) for pool, _ in runs},
+                          num_words=num_words, capitalized=capitalized, separators=separators)
+
+
+def _password_plan(policy):
+    plan = compile_policy(policy)
+    if not plan.characters:
+        raise ValueError("Please select at least one character type or remove exclusions")
+    return plan
+
+
+def _choices(plan, pool, k):
+    """Pick k characters from pool using os.urandom with rejection sampling."""
+    table, rejected = plan.tables[pool]
+    picked = b""
+    while len(picked) < k:
+        picked += _urandom(2 * (k - len(picked)) + 8).translate(table, rejected)
+    return picked[:k].decode('ascii')
+
+
+def _shuffle(items):
+    """Fisher-Yates shuffle driven by a single block of os.urandom bytes."""
+    entropy = _urandom(2 * len(items) + 16)
+    pos = 0
+    for i in range(len(items) - 1, 0, -1):
+        bound = i + 1
+        limit = 256 - 256 % bound
+        while True:
+            if pos == len(entropy):
+                entropy, pos = _urandom(32), 0
+            b = entropy[pos]
+            pos += 1
+            if b < limit:
+                break
+        j = b % bound
+        items[i], items[j] = items[j], items[i]
+
+
+def _rejected_error():
+    return ValueError("Every generated password was found in the breach corpus; use a stronger policy")
+
+
+@metrics.timed("generate_password")
+def generate_password(policy, reject=None):
+    """Return a random password honouring the policy's classes and minimums.
+
+    reject, if given, is called with each candidate and a new one is drawn
+    while it returns True.
+    """
+    for _ in range(MAX_REJECTED_ROUNDS):
+        password = _generate_password_once(policy)
+        if reject is None or not reject(password):
+            metrics.count("passwords_generated")
+            return password
+    raise _rejected_error()
+
+
+def _generate_password_once(policy):
+    plan = _password_plan(policy)
+
+    password = []
+    for pool, width in plan.runs:
+        password.extend(_choices(plan, pool, width))
+
+    if policy.shuffle:
+        _shuffle(password)
+
+    return ''.join(password)
+
+
+def _uniform_indices(bound, count):
+    """count integers uniform in [0, bound) from one os.urandom block.
+
+    Raw values at or above the largest multiple of bound are rejected rather
+    than folded with a modulo, which would bias the low indices.
+    """
+    np = optional_import("numpy")
+    dtype = np.uint8 if bound <= 1 << 8 else np.uint16 if bound <= 1 << 16 else np.uint32
+    span = 1 << (8 * np.dtype(dtype).itemsize)
+    limit = span - span % bound
+    out = np.empty(count, dtype=np.intp)
+    filled = 0
+    while filled < count:
+        need = count - filled
+        draw = need * span // limit + need // 16 + 64
+        raw = np.frombuffer(_urandom(draw * np.dtype(dtype).itemsize), dtype=dtype)
+        raw = raw[raw < limit][:need]
+        out[filled:filled + raw.size] = raw % bound
+        filled += raw.size
+    return out
+
+
+def _password_array(policy, count):
+    """(count, length) uint8 array of ASCII codes, one password per row."""
+    np = optional_import("numpy")
+    plan = _password_plan(policy)
+    length = sum(width for _, width in plan.runs)
+    passwords = np.empty((count, length), dtype=np.uint8)
+
+    # Consecutive slots sharing an alphabet are drawn in one go
+    start = 0
+    for pool, width in plan.runs:
+        codes = np.frombuffer(pool.encode('ascii'), dtype=np.uint8)
+        passwords[:, start:start + width] = codes[_uniform_indices(len(pool), count * width)].reshape(count, width)
+        start += width
+
+    if policy.shuffle:
+        # Fisher-Yates applied to every row at once, one column per step
+        rows = np.arange(count)
+        for i in range(length - 1, 0, -1):
+            j = _uniform_indices(i + 1, count)
+            swapped = passwords[rows, j]
+            passwords[rows, j] = passwords[:, i]
+            passwords[:, i] = swapped
+    return passwords
+
+
+@metrics.timed("generate_password_batch")
+def generate_password_batch(policy, count, reject=None):
+    """Return count passwords for one policy, generated as a single batch.
+
+    Uses NumPy over one large CSPRNG block when available and otherwise the
+    same rejection-sampled bytes in pure Python. Every password still gets
+    the policy's required symbols/upper/lower/digit and optional shuffle.
+    Passwords for which reject returns True are regenerated.
+    """
+    passwords = _password_batch_once(policy, count)
+    metrics.count("passwords_generated", len(passwords))
+    if reject is None:
+        return passwords
+    for _ in range(MAX_REJECTED_ROUNDS):
+        hits = [i for i, password in enumerate(passwords) if reject(password)]
+        if not hits:
+            return passwords
+        for i, password in zip(hits, _password_batch_once(policy, len(hits))):
+            passwords[i] = password
+    raise _rejected_error()
+
+
+def _password_batch_once(policy, count):
+    if count <= 0:
+        return []
+    if optional_import("numpy") is None:  # batches fall back to pure Python
+        return [_generate_password_once(policy) for _ in range(count)]
+    passwords = _password_array(policy, count)
+    data = passwords.tobytes().decode('ascii')
+    length = passwords.shape[1]
+    return [data[i:i + length] for i in range(0, len(data), length)]
+
+
+def _per_char_password(policy):
+    """The original GUI loop: one random.choice per character, kept for comparison."""
+    plan = _password_plan(policy)
+    password = [random.choice(pool) for pool in plan.required]
+    password.extend(random.choice(plan.characters) for _ in range(plan.fill))
+    if policy.shuffle:
+        random.shuffle(password)
+    return ''.join(password)
+
+
+def compare_throughput(policy, count=100_000):
+    """Passwords per second of the per-char loop, single calls and batches."""
+    optional_import("numpy")  # keep the one-off import out of the batch timing
+    results = {}
+    for name, run in (("per-char loop", lambda: [_per_char_password(policy) for _ in range(count)]),
+                      ("single call", lambda: [generate_password(policy) for _ in range(count)]),
+                      ("batch", lambda: generate_password_batch(policy, count))):
+        start = time.perf_counter()
+        run()
+        results[name] = count / (time.perf_counter() - start)
+    return results
+
+
+def passphrase_word_count(policy):
+    """Number of words a passphrase for this policy should contain."""
+    return compile_policy(policy).num_words
+
+
+@metrics.timed("generate_passphrase")
+def generate_passphrase(policy, word_index, reject=None):
+    """Return a passphrase drawn from a WordIndex, avoiding excluded characters.
+
+    Passphrases for which reject returns True are drawn again.
+    """
+    for _ in range(MAX_REJECTED_ROUNDS):
+        passphrase = _generate_passphrase_once(policy, word_index)
+        if reject is None or not reject(passphrase):
+            metrics.count("passphrases_generated")
+            return passphrase
+    raise _rejected_error()
+
+
+def _capitalize(word):
+    return word[:1].upper() + word[1:]
+
+
+def _generate_passphrase_once(policy, word_index):
+    plan = compile_policy(policy)
+    if not plan.separators:
+        raise ValueError("No passphrase separator left after exclusions")
+    num_words = plan.num_words
+    exclude = plan.excluded
+    rng = _counting_rng if metrics.enabled else _rng
+
+    # Words drawn for capitalised slots must stay clear of the exclusions once capitalised
+    capitalized = set(rng.sample(range(num_words), plan.capitalized))
+    accept = None
+    if capitalized and exclude:
+        accept = lambda slot, word: slot not in capitalized or exclude.isdisjoint(_capitalize(word))
+    words = word_index.sample(exclude, num_words, rng.randrange, accept)
+    for i in capitalized:
+        words[i] = _capitalize(words[i])
+
+    return rng.choice(plan.separators).join(words)
+
+
+def iter_passwords(policy, count, word_index=None, batch_size=10_000, reject=None):
+    """Yield count passwords, or passphrases when a word_index is given."""
+    if word_index is None:
+        while count > 0:
+            batch = min(batch_size, count)
+            yield from generate_password_batch(policy, batch, reject)
+            count -= batch
+    else:
+        for _ in range(count):
+            yield generate_passphrase(policy, word_index, reject)
+
+
+def write_passwords(passwords, stream, timestamp=None, chunk_size=10_000):
+    """Write passwords one per line, flushing to stream in large chunks.
+
+    With a timestamp each line uses the "[timestamp] password" format of the
+    GUI's export. Returns the number of lines written.
+    """
+    prefix = f"[{timestamp}] " if timestamp else ""
+    written = 0
+    chunk = []
+    for password in passwords:
+        chunk.append(f"{prefix}{password}\n")
+        if len(chunk) >= chunk_size:
+            stream.write(''.join(chunk))
+            written += len(chunk)
+            chunk.clear()
+    if chunk:
+        stream.write(''.join(chunk))
+        written += len(chunk)
+    return written
+
+
+# Word index and breach check of a sharded-generation worker, set up once by its initializer
+_worker_word_index = None
+_worker_reject = None
+
+
+def _init_shard_worker(wordlist, pwned_store):
+    global _worker_word_index, _worker_reject
+    if wordlist:
+        from word_index import WordIndex, open_word_list
+        _worker_word_index = WordIndex(open_word_list(wordlist))
+    if pwned_store:
+        from pwned_store import PwnedStore
+        _worker_reject = PwnedStore(pwned_store).is_pwned
+
+
+def _generate_shard(policy, count, prefix):
+    """Generate one shard inside a worker and return its output lines."""
+    passwords = iter_passwords(policy, count, _worker_word_index, reject=_worker_reject)
+    return ''.join(f"{prefix}{password}\n" for password in passwords)
+
+
+def write_sharded(policy, count, stream, workers=None, shard_size=100_000, timestamp=None,
+                  wordlist=None, progress=None, pwned_store=None):
+    """Generate count passwords across a process pool and write them in order.
+
+    The count is split into shards that workers generate independently; each
+    process draws from its own os.urandom stream. Shards are written in the
+    order they were requested, with at most two per worker in flight so memory
+    stays bounded. Passphrases are produced when a wordlist path is given, and
+    anything found in the Pwned Passwords store at pwned_store is regenerated.
+    progress, if set, is called as progress(done, count, elapsed) after each
+    shard. Returns the number of lines written.
+    """
+    import multiprocessing
+
+    # Surface policy and file errors here; a failing pool initializer would respawn workers forever
+    if wordlist is None:
+        _password_plan(policy)
+    else:
+        from word_index import open_word_list
+        open_word_list(wordlist)
+    if pwned_store:
+        from pwned_store import PwnedStore
+        PwnedStore(pwned_store).close()
+    workers = workers or os.cpu_count() or 1
+    prefix = f"[{timestamp}] " if timestamp else ""
+    started = time.perf_counter()
+    done = 0
+    pending = deque()
+
+    def write_oldest():
+        nonlocal done
+        size, result = pending.popleft()
+        stream.write(result.get())
+        done += size
+        if progress:
+            progress(done, count, time.perf_counter() - started)
+
+    with multiprocessing.Pool(workers, _init_shard_worker, (wordlist, pwned_store)) as pool:
+        for start in range(0, count, shard_size):
+            size = min(shard_size, count - start)
+            pending.append((size, pool.apply_async(_generate_shard, (policy, size, prefix))))
+            if len(pending) >= 2 * workers:
+                write_oldest()
+        while pending:
+            write_oldest()
+    return done
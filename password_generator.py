@@ -1,15 +1,32 @@
+import time
+import_started = time.perf_counter()  # start-up timing (see the startup-time command) begins here
 import tkinter as tk
 from tkinter import ttk, messagebox
-import random
-import string
-import math
-from datetime import datetime, timedelta
-import requests
-import json
+from datetime import datetime
 import os
+import sys
+import json
+import threading
+import argparse
+from contextlib import nullcontext
+from dataclasses import replace
+import metrics
+from optional import optional_import
+from password_engine import (PasswordPolicy, load_policies, generate_password as engine_generate_password,
+                             generate_passphrase as engine_generate_passphrase, iter_passwords, write_passwords,
+                             compare_throughput, write_sharded)
+from word_index import WordIndex, open_word_list, discover_word_lists
+from threat_feed import ThreatFeed
+from strength import calculate_entropy, evaluate_password
+from pattern_estimator import PatternEstimator
+from audit import run_audit
+from pwned_store import PwnedStore, open_pwned_store, build_store, iter_hash_file, iter_range_directory
+from history_store import HistoryRing, LogWriter, open_history_log
+imported_at = time.perf_counter()
 
 class PasswordGenerator:
-    def __init__(self, root):
+    def __init__(self, root, history_capacity=10, export_log="passwords.log"):
+        self.timings = {"construct_started": time.perf_counter()}  # perf_counter() of each start-up stage
         self.root = root
         self.root.title("Advanced Password Generator")
         self.root.geometry("480x960")
@@ -23,19 +40,30 @@ class PasswordGenerator:
         self.random_var = tk.BooleanVar(value=True)
         self.passphrase_var = tk.BooleanVar(value=False)
         self.exclude_var = tk.StringVar(value="")
+        self.wordlist_var = tk.StringVar(value="default")
         self.generated_password = tk.StringVar()
         self.test_password = tk.StringVar()
-        self.password_history = []
+        self.password_history = HistoryRing(history_capacity)
+        self.export_log_path = export_log
+        self.export_log = None  # opened on the first export
         
         # Threat-adaptive settings
         self.threat_level = tk.StringVar(value="Low")
         self.threat_trend = tk.StringVar(value="Stable")
-        self.min_length = 12
-        self.min_symbols = 0
-        self.min_words = 3
-        
-        # Load word list
-        self.word_list = self.load_word_list("wordlist.txt")
+        self.threat_feed = ThreatFeed()  # started once the window is up
+        self.threat_snapshot = self.threat_feed.snapshot
+        
+        # The word list, estimator and breach store are loaded on a background thread once the
+        # window has been drawn; ensure_loaded() waits for them if they are needed sooner
+        self.word_list = None
+        self.word_index = None
+        self.word_lists = discover_word_lists()  # wordlist.txt plus wordlists/<language>.txt
+        self.estimator = None
+        self.pwned_store = None
+        self.ready = False
+        self.load_errors = []  # shown on the Tk thread once loading finishes
+        self._loader = None
+        self._loaded = None
         
         # Style configuration
         self.style = ttk.Style()
@@ -44,23 +72,99 @@ class PasswordGenerator:
         # GUI Elements
         self.create_gui()
         
-        # Initial threat check
+        # Initial threat check; the feed refreshes in the background from here on
         self.update_threat_level()
+        self.root.after(1000, self.poll_threat_feed)
+        self.root.bind("<Map>", self.on_first_map)
+        self.timings["constructed"] = time.perf_counter()
+    
+    def on_first_map(self, event):
+        self.root.unbind("<Map>")
+        self.root.after_idle(self.start_background_load)
+    
+    def start_background_load(self):
+        """Once the window is drawn, start the threat feed and load everything else off the Tk thread."""
+        self.root.update_idletasks()  # finish drawing before the loader competes for the GIL
+        self.timings["first_paint"] = time.perf_counter()
+        self.threat_feed.start()
+        if not self.ready:
+            self._loader = threading.Thread(target=self.load_resources, name="StartupLoader", daemon=True)
+            self._loader.start()
+            self.root.after(50, self.poll_loader)
+    
+    def load_resources(self):
+        """Open the word list, pattern estimator and breach store; runs on the loader thread, so no Tk calls."""
+        word_list = self.load_word_list("wordlist.txt")
+        loaded = (word_list, WordIndex(word_list), PatternEstimator(word_list), self.load_pwned_store("pwned.bin"))
+        optional_import("numpy")  # warm the import that pool sizes and batches would otherwise pay for on first use
+        self._loaded = loaded
+    
+    def poll_loader(self):
+        if self._loader.is_alive():
+            self.root.after(50, self.poll_loader)
+        else:
+            self.finish_loading()
+    
+    def ensure_loaded(self):
+        """Wait for the background load; for anything that needs the word list before it is ready."""
+        if self.ready:
+            return
+        if self._loader is None:
+            self.load_resources()
+        else:
+            self._loader.join()
+        self.finish_loading()
+    
+    def finish_loading(self):
+        if self.ready:
+            return
+        self.word_list, self.word_index, self.estimator, self.pwned_store = self._loaded
+        self.ready = True
+        self.timings["ready"] = time.perf_counter()
+        self.status_label.config(text="Ready")
+        for message in self.load_errors:
+            messagebox.showerror("Error", message)
+        self.load_errors.clear()
     
     def load_word_list(self, filename):
         try:
-            with open(filename, 'r') as file:
-                words = [line.strip() for line in file if line.strip()]
-            if not words:
-                raise ValueError("Word list is empty")
-            return words
+            return open_word_list(filename)
         except FileNotFoundError:
-            messagebox.showerror("Error", f"Word list file '{filename}' not found. Using default list.")
+            self.load_errors.append(f"Word list file '{filename}' not found. Using default list.")
             return ["apple", "blue", "cat", "dog"]
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load word list: {str(e)}. Using default list.")
+            self.load_errors.append(f"Failed to load word list: {str(e)}. Using default list.")
             return ["apple", "blue", "cat", "dog"]
             
+    def load_pwned_store(self, filename):
+        """Open the optional offline Pwned Passwords store (see the build-pwned command)."""
+        try:
+            return open_pwned_store(filename)
+        except Exception as e:
+            self.load_errors.append(f"Failed to open breached password store: {str(e)}. Breach checks disabled.")
+            return None
+    
+    def current_word_index(self):
+        """Index of the word list picked for passphrases; the default list if it cannot be opened."""
+        self.ensure_loaded()
+        name = self.wordlist_var.get()
+        if name == "default" or name not in self.word_lists:
+            return self.word_index
+        try:
+            return self.word_lists.get(name)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load word list '{name}': {str(e)}. Using default list.")
+            self.wordlist_var.set("default")
+            return self.word_index
+
+    def passphrase_pool_size(self):
+        """Words actually available to passphrases under the current list and exclusions."""
+        return self.current_word_index().pool_size(self.exclude_var.get())
+
+    def reject_pwned(self):
+        self.ensure_loaded()
+        return self.pwned_store.is_pwned if self.pwned_store else None
+            
     def configure_greyscale_theme(self):
         bg_color = "#808080"
         input_color = "#4d4d4d"
@@ -116,6 +220,9 @@ class PasswordGenerator:
         exclude_frame.grid(row=2, column=0, columnspan=3, pady=10, sticky=(tk.W, tk.E))
         ttk.Label(exclude_frame, text="Exclude Characters:", style="TLabel").grid(row=0, column=0, pady=5)
         ttk.Entry(exclude_frame, textvariable=self.exclude_var, width=20, style="TEntry").grid(row=0, column=1, pady=5)
+        ttk.Label(exclude_frame, text="Passphrase Words:", style="TLabel").grid(row=1, column=0, pady=5)
+        ttk.Combobox(exclude_frame, textvariable=self.wordlist_var, values=self.word_lists.names() or ["default"],
+                     width=17, state="readonly").grid(row=1, column=1, pady=5)
         
         ttk.Label(main_frame, text="Generated Password:", style="TLabel").grid(row=3, column=0, pady=5)
         pass_entry = ttk.Entry(main_frame, textvariable=self.generated_password, width=40, style="TEntry")
@@ -161,76 +268,41 @@ class PasswordGenerator:
         ttk.Entry(tester_frame, textvariable=self.test_password, width=30, style="TEntry").grid(row=0, column=1, pady=5)
         ttk.Button(tester_frame, text="Test Strength", 
                   command=self.test_password_strength, style="TButton").grid(row=0, column=2, pady=5)
+        self.live_estimate = ttk.Label(tester_frame, text="", style="TLabel")
+        self.live_estimate.grid(row=1, column=0, columnspan=3, pady=2, sticky=tk.W)
+        self.test_password.trace_add("write", self.update_live_estimate)
+        
+        self.status_label = ttk.Label(main_frame, text="Loading word list...", style="TLabel")
+        self.status_label.grid(row=14, column=0, columnspan=3, pady=5, sticky=tk.W)
+    
+    def update_live_estimate(self, *args):
+        """Pattern-aware guess estimate, refreshed on every keystroke in the tester."""
+        password = self.test_password.get()
+        if not password:
+            self.live_estimate.config(text="")
+            return
+        self.ensure_loaded()
+        estimate = self.estimator.estimate(password)
+        patterns = ", ".join(sorted({m.pattern for m in estimate.sequence} - {"bruteforce"}))
+        found = f" (found: {patterns})" if patterns else ""
+        self.live_estimate.config(text=f"~2^{estimate.bits:.0f} guesses to crack{found}")
     
+    @metrics.timed("update_threat_level")
     def update_threat_level(self):
-        """Fetch or load cached HIBP breach data with refined time window and scaling."""
-        cache_file = "threat_cache.json"
-        cache_timeout = 300  # 5 minutes
-        
-        # Check for cached data
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r') as f:
-                cache = json.load(f)
-            if (datetime.now() - datetime.fromisoformat(cache["timestamp"])).total_seconds() < cache_timeout:
-                breaches = cache["data"]
-            else:
-                breaches = self.fetch_threat_data(cache_file)
-        else:
-            breaches = self.fetch_threat_data(cache_file)
-        
-        # Analyze breaches (last 1 day)
-        recent_breaches = [b for b in breaches if 
-                          datetime.strptime(b["BreachDate"], "%Y-%m-%d") > 
-                          datetime.now() - timedelta(days=1)]
-        total_accounts = sum(b["PwnCount"] for b in recent_breaches)
-        password_breaches = sum(1 for b in recent_breaches if "Passwords" in b["DataClasses"])
-        email_breaches = sum(1 for b in recent_breaches if "Email addresses" in b["DataClasses"])
-        
-        # Refined threat logic with logarithmic scaling
-        if password_breaches >= 2 and total_accounts > 100_000:  # Multiple password leaks today
-            self.threat_level.set("High")
-            self.threat_trend.set("Urgent Password Leaks")
-            self.min_length = min(32, 12 + int(math.log10(max(1, total_accounts)) * 3))  # Log scale: 100K=15, 1M=18, 10M=21
-            self.min_symbols = 3
-            self.min_words = 6
-            context = f"Urgent: {password_breaches} password leaks today ({total_accounts:,} accounts). Use long, complex passwords."
-        elif email_breaches > 0 and password_breaches > 0:  # Phishing risk
-            self.threat_level.set("Medium")
-            self.threat_trend.set("Email/Password Exposure")
-            self.min_length = min(32, 12 + int(math.log10(max(1, total_accounts)) * 2))  # Log scale: 100K=14, 1M=16, 10M=18
-            self.min_symbols = 2
-            self.min_words = 4
-            context = f"Today’s leaks include emails and passwords ({total_accounts:,} accounts). Add variety."
-        elif total_accounts > 10_000:  # Minor breaches, brute force risk
-            self.threat_level.set("Medium")
-            self.threat_trend.set("Minor Breach Activity")
-            self.min_length = min(32, 12 + int(math.log10(max(1, total_accounts)) * 1.5))  # Log scale: 10K=13, 100K=15, 1M=16
-            self.min_symbols = 1
-            self.min_words = 4
-            context = f"Minor breaches today ({total_accounts:,} accounts). Slightly longer passwords advised."
-        else:
-            self.threat_level.set("Low")
-            self.threat_trend.set("Stable")
-            self.min_length = 12
-            self.min_symbols = 0
-            self.min_words = 3
-            context = "No significant breaches in the last 24 hours. 12+ chars sufficient."
-        
-        self.threat_feedback.config(text=context)
+        """Apply the latest threat snapshot; never waits on the network or disk."""
+        snapshot = self.threat_feed.snapshot
+        self.threat_feed.request_refresh()
+        
+        self.threat_snapshot = snapshot
+        self.threat_level.set(snapshot.level)
+        self.threat_trend.set(snapshot.trend)
+        self.threat_feedback.config(text=snapshot.context)
     
-    def fetch_threat_data(self, cache_file):
-        """Fetch breach data from HIBP and cache it."""
-        try:
-            response = requests.get("https://haveibeenpwned.com/api/v3/breaches", 
-                                  headers={"User-Agent": "PasswordGenerator"})
-            response.raise_for_status()
-            breaches = response.json()
-            with open(cache_file, 'w') as f:
-                json.dump({"timestamp": datetime.now().isoformat(), "data": breaches}, f)
-            return breaches
-        except Exception as e:
-            self.threat_feedback.config(text=f"Threat data fetch failed: {str(e)}. Using defaults.")
-            return []  # Fallback to empty list
+    def poll_threat_feed(self):
+        """Pick up snapshots published by the background refresher on the Tk thread."""
+        if self.threat_feed.snapshot is not self.threat_snapshot:
+            self.update_threat_level()
+        self.root.after(1000, self.poll_threat_feed)
     
     def generate_password(self):
         self.update_threat_level()
@@ -244,92 +316,33 @@ class PasswordGenerator:
             self.update_strength_indicator(password)
             self.update_history(password)
     
+    def current_policy(self):
+        """Snapshot the GUI options as a PasswordPolicy raised to the current threat minimums."""
+        return PasswordPolicy(length=self.length_var.get(),
+                              upper=self.upper_var.get(),
+                              lower=self.lower_var.get(),
+                              digits=self.digits_var.get(),
+                              symbols=self.symbols_var.get(),
+                              shuffle=self.random_var.get(),
+                              exclude=self.exclude_var.get()).with_threat(self.threat_snapshot)
+
     def generate_random_password(self):
-        length = max(self.length_var.get(), self.min_length)
-        characters = ""
-        exclude = set(self.exclude_var.get())
-        
-        if self.upper_var.get():
-            characters += ''.join(c for c in string.ascii_uppercase if c not in exclude)
-        if self.lower_var.get():
-            characters += ''.join(c for c in string.ascii_lowercase if c not in exclude)
-        if self.digits_var.get():
-            characters += ''.join(c for c in string.digits if c not in exclude)
-        if self.symbols_var.get():
-            characters += ''.join(c for c in string.punctuation if c not in exclude)
-            
-        if not characters:
-            messagebox.showerror("Error", "Please select at least one character type or remove exclusions")
+        try:
+            return engine_generate_password(self.current_policy(), self.reject_pwned())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return ""
-            
-        password = []
-        if self.symbols_var.get() and self.min_symbols > 0:
-            password.extend(random.choice([c for c in string.punctuation if c not in exclude]) 
-                          for _ in range(self.min_symbols))
-        if self.upper_var.get():
-            password.append(random.choice([c for c in string.ascii_uppercase if c not in exclude]))
-        if self.lower_var.get():
-            password.append(random.choice([c for c in string.ascii_lowercase if c not in exclude]))
-        if self.digits_var.get():
-            password.append(random.choice([c for c in string.digits if c not in exclude]))
-            
-        remaining_length = length - len(password)
-        if remaining_length > 0:
-            password.extend(random.choice(characters) for _ in range(remaining_length))
-            
-        if self.random_var.get():
-            random.shuffle(password)
-            
-        return ''.join(password)
         
     def generate_passphrase(self):
-        length = max(self.length_var.get(), self.min_length)
-        num_words = max(self.min_words, min(length // 4, 6))
-        exclude = set(self.exclude_var.get())
-        
-        valid_words = [word for word in self.word_list if not any(c in exclude for c in word)]
-        if len(valid_words) < num_words:
-            messagebox.showerror("Error", "Not enough words available after exclusions")
+        try:
+            return engine_generate_passphrase(self.current_policy(), self.current_word_index(),
+                                              self.reject_pwned())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return ""
-            
-        words = random.sample(valid_words, num_words)
-        if self.upper_var.get():
-            for i in random.sample(range(num_words), min(2, num_words)):
-                words[i] = words[i].capitalize()
-                
-        separator = "-"
-        if self.digits_var.get() and self.symbols_var.get():
-            separator = random.choice("1234567890!@#$%^&*")
-        elif self.digits_var.get():
-            separator = random.choice("1234567890")
-        elif self.symbols_var.get():
-            separator = random.choice("!@#$%^&*")
-            
-        return separator.join(words)
         
     def calculate_entropy(self, password):
-        if not password:
-            return 0.0
-            
-        char_pool = 0
-        if any(c.isupper() for c in password):
-            char_pool += 26
-        if any(c.islower() for c in password):
-            char_pool += 26
-        if any(c.isdigit() for c in password):
-            char_pool += 10
-        if any(c in string.punctuation for c in password):
-            char_pool += 32
-        
-        if self.passphrase_var.get() and any(sep in password for sep in ["-", "!", "@", "#", "$", "%", "^", "&", "*", "0-9"]):
-            num_words = len([w for w in password.split(sep) if w.isalpha() 
-                           for sep in ["-", "!", "@", "#", "$", "%", "^", "&", "*"]])
-            char_pool = len(self.word_list)
-            entropy = num_words * math.log2(char_pool)
-        else:
-            entropy = len(password) * math.log2(max(char_pool, 1))
-            
-        return round(entropy, 2)
+        return calculate_entropy(password, self.passphrase_var.get(), self.passphrase_pool_size())
         
     def update_strength_indicator(self, password):
         if not password:
@@ -339,66 +352,31 @@ class PasswordGenerator:
             self.threat_feedback.config(text="No password to evaluate.")
             return
             
-        length = len(password)
-        has_upper = any(c.isupper() for c in password)
-        has_lower = any(c.islower() for c in password)
-        has_digit = any(c.isdigit() for c in password)
-        num_symbols = sum(1 for c in password if c in string.punctuation)
-        num_words = len([w for w in password.split(sep) if w.isalpha() 
-                        for sep in ["-", "!", "@", "#", "$", "%", "^", "&", "*"]]) if self.passphrase_var.get() else 0
-        
-        char_pool = 0
-        if has_upper: char_pool += 26
-        if has_lower: char_pool += 26
-        if has_digit: char_pool += 10
-        if num_symbols > 0: char_pool += 32
-        entropy = length * math.log2(max(char_pool, 1)) if not self.passphrase_var.get() else num_words * math.log2(len(self.word_list))
-        
-        score = min(100, int(entropy * 2))
+        self.ensure_loaded()
+        pwned = bool(self.pwned_store and self.pwned_store.is_pwned(password))
+        report = evaluate_password(password, self.threat_snapshot, self.passphrase_var.get(),
+                                   self.passphrase_pool_size(), pwned, self.estimator)
         
-        self.strength_bar["value"] = score
-        if score >= 90:
-            strength = "Very Strong"
+        self.strength_bar["value"] = report.score
+        if report.score >= 70:
             self.strength_bar["style"] = "Green.Horizontal.TProgressbar"
-        elif score >= 70:
-            strength = "Strong"
-            self.strength_bar["style"] = "Green.Horizontal.TProgressbar"
-        elif score >= 50:
-            strength = "Moderate"
+        elif report.score >= 50:
             self.strength_bar["style"] = "Yellow.Horizontal.TProgressbar"
         else:
-            strength = "Weak"
             self.strength_bar["style"] = "Red.Horizontal.TProgressbar"
             
-        self.strength_text.config(text=strength)
-        entropy_bits = self.calculate_entropy(password)
-        self.entropy_label.config(text=f"{entropy_bits} bits")
-        
-        # Granular feedback
-        feedback = []
-        if length < self.min_length:
-            feedback.append(f"Add {self.min_length - length} chars to reach {self.min_length}.")
-        if self.threat_trend.get() in ["Urgent Password Leaks", "Email/Password Exposure"] and not has_upper:
-            feedback.append("Add 1+ uppercase letters.")
-        if self.threat_trend.get() in ["Urgent Password Leaks", "Email/Password Exposure"] and not has_digit:
-            feedback.append("Add 1+ digits.")
-        if num_symbols < self.min_symbols:
-            feedback.append(f"Add {self.min_symbols - num_symbols} more symbols.")
-        if self.passphrase_var.get() and num_words < self.min_words:
-            feedback.append(f"Add {self.min_words - num_words} more words to reach {self.min_words}.")
+        self.strength_text.config(text=report.strength)
+        self.entropy_label.config(text=f"{report.entropy} bits ({report.guess_bits} bits vs. pattern guessing)")
         
-        if feedback:
-            self.threat_feedback.config(text=f"{self.threat_feedback.cget('text')} Suggestions: {' '.join(feedback)}")
+        if report.suggestions:
+            self.threat_feedback.config(text=f"{self.threat_feedback.cget('text')} Suggestions: {' '.join(report.suggestions)}")
         else:
             self.threat_feedback.config(text=f"{self.threat_feedback.cget('text')} Password meets current threat needs.")
     
     def update_history(self, password):
-        self.password_history.insert(0, password)
-        if len(self.password_history) > 10:
-            self.password_history.pop()
-        self.history_listbox.delete(0, tk.END)
-        for pwd in self.password_history:
-            self.history_listbox.insert(tk.END, pwd)
+        if self.password_history.append(password) is not None:
+            self.history_listbox.delete(tk.END)
+        self.history_listbox.insert(0, password)
             
     def clear_history(self):
         self.password_history.clear()
@@ -430,12 +408,12 @@ class PasswordGenerator:
             messagebox.showwarning("Warning", "No password to export")
             return
             
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        filename = "passwords.txt"
         try:
-            with open(filename, 'a') as file:
-                file.write(f"[{timestamp}] {password}\n")
-            messagebox.showinfo("Success", f"Password exported to {filename}")
+            if self.export_log is None:
+                self.export_log = open_history_log(self.export_log_path)
+            self.export_log.append(password)
+            self.export_log.sync()
+            messagebox.showinfo("Success", f"Password exported to {self.export_log_path} (encrypted)")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export password: {str(e)}")
 
@@ -443,6 +421,341 @@ def main():
     root = tk.Tk()
     app = PasswordGenerator(root)
     root.mainloop()
+    if metrics.enabled:
+        metrics.write_metrics(os.environ["APG_METRICS"])
+
+def build_cli_parser():
+    parser = argparse.ArgumentParser(description="Advanced Password Generator (headless mode)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Stream passwords or passphrases to stdout or a file")
+    add_policy_arguments(gen)
+    gen.add_argument("--passphrase", action="store_true", help="Generate passphrases instead of passwords")
+    gen.add_argument("--min-words", type=int, help="Minimum number of passphrase words (default 3)")
+    gen.add_argument("--wordlist", default="wordlist.txt", help="Word list used for passphrases")
+    gen.add_argument("-o", "--output", help="Append to this file instead of writing to stdout")
+    gen.add_argument("--timestamp", action="store_true",
+                     help="Prefix each line with [timestamp] like the GUI export")
+    gen.add_argument("--workers", type=int, default=1,
+                     help="Generate in this many processes (0 uses every core)")
+    gen.add_argument("--shard-size", type=int, default=100_000, help="Passwords per worker task")
+    gen.add_argument("--progress", action="store_true", help="Report progress and throughput on stderr")
+    gen.add_argument("--pwned-store", help="Regenerate anything found in this Pwned Passwords store")
+    gen.add_argument("--encrypt", action="store_true",
+                     help="Append to -o as an encrypted history log instead of plain text")
+    gen.add_argument("--key-file", help="Key for --encrypt (default <output>.key, created with a new log)")
+    add_instrumentation_arguments(gen)
+
+    throughput = commands.add_parser("throughput",
+                                     help="Compare passwords/sec of the per-char loop and the batch generator")
+    add_policy_arguments(throughput)
+    throughput.set_defaults(count=100_000)
+    add_instrumentation_arguments(throughput)
+
+    pwned = commands.add_parser("build-pwned",
+                                help="Build the offline Pwned Passwords store from the HIBP SHA-1 corpus")
+    pwned.add_argument("source", help="Ordered-by-hash SHA1:COUNT file or a directory of range files")
+    pwned.add_argument("-o", "--output", default="pwned.bin", help="Store to write")
+    pwned.add_argument("--min-count", type=int, default=1,
+                       help="Skip hashes seen fewer times than this to shrink the store")
+
+    audit = commands.add_parser("audit", help="Score a password dump (one per line) into a CSV/JSONL report")
+    audit.add_argument("input", nargs="?", default="-", help="File to audit, or - for stdin")
+    audit.add_argument("-o", "--output", help="Report file (default stdout)")
+    audit.add_argument("--format", choices=("csv", "jsonl"), default="csv", help="Report format")
+    audit.add_argument("--summary", help="Write the aggregate histograms as JSON to this file (default stderr)")
+    audit.add_argument("--workers", type=int, default=0, help="Scoring processes (0 uses every core)")
+    audit.add_argument("--chunk-size", type=int, default=10_000, help="Passwords per worker task")
+    audit.add_argument("--passphrase", action="store_true", help="Score entries as passphrases")
+    audit.add_argument("--wordlist", default="wordlist.txt",
+                       help="Word list used for dictionary matching and passphrase entropy")
+    audit.add_argument("--pwned-store", help="Also flag passwords found in this Pwned Passwords store")
+    audit.add_argument("--offline", action="store_true",
+                       help="Use the cached threat policy (or the Low defaults) instead of fetching HIBP")
+    audit.add_argument("--progress", action="store_true", help="Report progress and throughput on stderr")
+    add_instrumentation_arguments(audit)
+
+    history = commands.add_parser("history", help="Decrypt entries from an encrypted export log")
+    history.add_argument("log", nargs="?", default="passwords.log", help="Log written by Export or --encrypt")
+    history.add_argument("--key-file", help="Key for the log (default <log>.key)")
+    history.add_argument("--since", help="Only entries at or after this ISO date/time")
+    history.add_argument("--until", help="Only entries at or before this ISO date/time")
+
+    serve = commands.add_parser("serve", help="Serve generation and scoring over local HTTP")
+    serve.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    serve.add_argument("--port", type=int, default=8080, help="TCP port to listen on")
+    serve.add_argument("--unix-socket", help="Listen on this Unix socket instead of TCP")
+    serve.add_argument("--wordlist", default="wordlist.txt", help="Default word list for passphrases and scoring")
+    serve.add_argument("--wordlist-dir", default="wordlists",
+                       help="Directory of <name>.txt lists that requests can pick with wordlist=<name>")
+    serve.add_argument("--pwned-store", help="Reject and flag passwords found in this Pwned Passwords store")
+    serve.add_argument("--policy-file", help="JSON file of named policies that requests pick with tenant=<name>")
+    serve.add_argument("--metrics", action="store_true",
+                       help="Record counters and latencies and serve them at /metrics")
+
+    loadtest = commands.add_parser("loadtest",
+                                   help="Measure the service's requests/sec and p50/p99 latency locally")
+    loadtest.add_argument("-n", "--requests", type=int, default=10_000, help="Total requests to send")
+    loadtest.add_argument("-c", "--concurrency", type=int, default=50, help="Keep-alive connections")
+    loadtest.add_argument("--endpoint", default="/generate?length=16",
+                          help="Path to request (/score is sent as a POST)")
+    loadtest.add_argument("--breaches", type=int, default=1_000,
+                          help="Synthetic breaches served by the stand-in HIBP endpoint")
+    loadtest.add_argument("--unix-socket", help="Run the service on this Unix socket instead of TCP")
+
+    startup = commands.add_parser("startup-time",
+                                  help="Open the GUI, report import/construct/first-paint/ready times and close it")
+    startup.add_argument("--budget", type=float,
+                         help="Exit non-zero if time to first paint exceeds this many milliseconds")
+    return parser
+
+def add_policy_arguments(parser):
+    parser.add_argument("-n", "--count", type=int, default=1, help="Number of passwords to generate")
+    parser.add_argument("-l", "--length", type=int, help="Password length (default 12)")
+    for name, label in (("upper", "uppercase letters"), ("lower", "lowercase letters"),
+                        ("digits", "digits"), ("symbols", "symbols")):
+        parser.add_argument(f"--{name}", dest=name, action="store_true", default=None,
+                            help=f"Include {label} (the default; re-enables them over a --tenant policy)")
+        parser.add_argument(f"--no-{name}", dest=name, action="store_false", help=f"Exclude {label}")
+    parser.add_argument("--shuffle", dest="shuffle", action="store_true", default=None,
+                        help="Shuffle required characters into the password (the default)")
+    parser.add_argument("--no-shuffle", dest="shuffle", action="store_false",
+                        help="Keep required characters at the front instead of shuffling")
+    parser.add_argument("--exclude", help="Characters to exclude")
+    parser.add_argument("--min-symbols", type=int, help="Minimum number of symbols (default 0)")
+    parser.add_argument("--policy-file", help="JSON file of named policies (see load_policies)")
+    parser.add_argument("--tenant", help="Start from this named policy in --policy-file; "
+                                         "options given on the command line still override it")
+
+def add_instrumentation_arguments(parser):
+    parser.add_argument("--metrics", dest="metrics_file", metavar="FILE",
+                        help="Record counters and latency histograms and write them here when done (- for stderr)")
+    parser.add_argument("--metrics-format", choices=("json", "prometheus"), default="json",
+                        help="Format of --metrics")
+    parser.add_argument("--profile", nargs="?", const="", metavar="FILE",
+                        help="Run under cProfile, print the top functions to stderr and save the stats to FILE")
+
+def policy_from_args(args):
+    """The command line's PasswordPolicy, on top of the --tenant policy if one was named.
+
+    Only options actually given override the tenant's; the rest keep its values.
+    """
+    options = {name: getattr(args, name, None) for name in
+               ("length", "upper", "lower", "digits", "symbols", "shuffle", "exclude", "min_symbols", "min_words")}
+    options = {name: value for name, value in options.items() if value is not None}
+    if not args.tenant:
+        return PasswordPolicy(**options)
+    if not args.policy_file:
+        raise ValueError("--tenant needs --policy-file")
+    policies = load_policies(args.policy_file)
+    if args.tenant not in policies:
+        raise ValueError(f"No policy named '{args.tenant}' in {args.policy_file}")
+    return replace(policies[args.tenant], **options)
+
+def report_progress(done, total, elapsed, verb="Generated"):
+    rate = done / elapsed if elapsed > 0 else 0
+    count = f"{done:,}/{total:,}" if total else f"{done:,}"
+    print(f"\r{verb} {count} ({rate:,.0f} passwords/sec)", end="", file=sys.stderr, flush=True)
+
+def audit_main(args):
+    feed = ThreatFeed()
+    if args.offline:
+        feed.max_age = float("inf")  # whatever is cached counts as fresh
+    feed.refresh()
+    source = sys.stdin if args.input == "-" else open(args.input, 'r', errors='replace')
+    report = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        summary = run_audit(source, report, feed.snapshot, fmt=args.format, workers=args.workers or None,
+                            chunk_size=max(args.chunk_size, 1), passphrase=args.passphrase,
+                            wordlist=args.wordlist, pwned_store=args.pwned_store,
+                            progress=(lambda done, elapsed: report_progress(done, None, elapsed, "Audited"))
+                            if args.progress else None)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if report is not sys.stdout:
+            report.close()
+    if args.progress:
+        print(file=sys.stderr)
+    summary["threat_level"] = feed.snapshot.level
+    if args.summary:
+        with open(args.summary, 'w') as file:
+            json.dump(summary, file, indent=2)
+    else:
+        print(json.dumps(summary, indent=2), file=sys.stderr)
+    return 0
+
+def history_main(args):
+    if not os.path.exists(args.log):
+        raise FileNotFoundError(f"No history log at '{args.log}'")
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    until = datetime.fromisoformat(args.until).timestamp() if args.until else None
+    with open_history_log(args.log, args.key_file) as log:
+        for entry in log.entries(since, until):
+            timestamp = datetime.fromtimestamp(entry.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            sys.stdout.write(f"[{timestamp}] {entry.password}\n")
+    return 0
+
+def serve_main(args):
+    import asyncio
+    from service import GenerationService, serve
+
+    if args.metrics:
+        metrics.enable()
+    store = PwnedStore(args.pwned_store) if args.pwned_store else None
+    policies = load_policies(args.policy_file) if args.policy_file else None
+    service = GenerationService(args.wordlist, pwned_store=store, wordlist_dir=args.wordlist_dir,
+                                policies=policies)
+    where = args.unix_socket or f"http://{args.host}:{args.port}"
+    print(f"Serving on {where}", file=sys.stderr)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def startup_main(args):
+    """Open the GUI until it is ready and report how long each start-up stage took."""
+    tk_started = time.perf_counter()
+    root = tk.Tk()
+    app = PasswordGenerator(root)
+
+    def close_when_ready():
+        if app.ready:
+            root.destroy()
+        else:
+            root.after(10, close_when_ready)
+
+    root.after(10, close_when_ready)
+    root.mainloop()
+    app.threat_feed.stop()
+
+    def ms(seconds):
+        return round(seconds * 1000, 1)
+
+    timings = app.timings
+    report = {"import_ms": ms(imported_at - import_started),
+              "tk_init_ms": ms(timings["construct_started"] - tk_started),
+              "construct_ms": ms(timings["constructed"] - timings["construct_started"]),
+              "first_paint_ms": ms(timings["first_paint"] - import_started),
+              "ready_ms": ms(timings["ready"] - import_started)}
+    print(json.dumps(report, indent=2))
+    if args.budget is not None and report["first_paint_ms"] > args.budget:
+        print(f"First paint took {report['first_paint_ms']} ms, over the {args.budget:g} ms budget", file=sys.stderr)
+        return 1
+    return 0
+
+def cli_main(argv=None):
+    args = build_cli_parser().parse_args(argv)
+    metrics_file = getattr(args, "metrics_file", None)
+    profile = getattr(args, "profile", None)
+    if metrics_file:
+        metrics.enable()
+    with metrics.profiled(profile) if profile is not None else nullcontext():
+        status = run_command(args)
+    if metrics_file:
+        try:
+            metrics.write_metrics(metrics_file, args.metrics_format)
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    return status
+
+def run_command(args):
+    if args.command == "startup-time":
+        try:
+            return startup_main(args)
+        except tk.TclError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.command in ("serve", "loadtest"):
+        try:
+            if args.command == "serve":
+                return serve_main(args)
+            import asyncio
+            from loadtest import run_load_test
+            print(json.dumps(asyncio.run(run_load_test(max(args.requests, 1), max(args.concurrency, 1),
+                                                       args.endpoint, breaches=args.breaches,
+                                                       unix_socket=args.unix_socket)), indent=2))
+            return 0
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.command == "audit":
+        try:
+            return audit_main(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.command == "history":
+        try:
+            return history_main(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.command == "build-pwned":
+        try:
+            hashes = (iter_range_directory(args.source, args.min_count) if os.path.isdir(args.source)
+                      else iter_hash_file(args.source, args.min_count))
+            count = build_store(hashes, args.output)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"Wrote {count:,} hashes to {args.output}")
+        return 0
+    try:
+        policy = policy_from_args(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.command == "throughput":
+        try:
+            results = compare_throughput(policy, max(args.count, 1))
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        baseline = results["per-char loop"]
+        for name, rate in results.items():
+            print(f"{name:>14}: {rate:12,.0f} passwords/sec ({rate / baseline:.1f}x)")
+        return 0
+    try:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S") if args.timestamp else None
+        log = None
+        if args.encrypt:
+            if not args.output:
+                raise ValueError("--encrypt needs an output file (-o)")
+            log = open_history_log(args.output, args.key_file)
+            output, timestamp = LogWriter(log), None  # the log records its own timestamps
+        else:
+            output = open(args.output, 'a') if args.output else sys.stdout
+        try:
+            if args.workers != 1:
+                write_sharded(policy, args.count, output, workers=args.workers or None,
+                              shard_size=max(args.shard_size, 1), timestamp=timestamp,
+                              wordlist=args.wordlist if args.passphrase else None,
+                              progress=report_progress if args.progress else None,
+                              pwned_store=args.pwned_store)
+            else:
+                word_index = WordIndex(open_word_list(args.wordlist)) if args.passphrase else None
+                store = PwnedStore(args.pwned_store) if args.pwned_store else None
+                passwords = iter_passwords(policy, args.count, word_index, reject=store.is_pwned if store else None)
+                started = time.perf_counter()
+                written = write_passwords(passwords, output, timestamp)
+                if args.progress:
+                    report_progress(written, args.count, time.perf_counter() - started)
+        finally:
+            if log is not None:
+                log.close()
+            elif output is not sys.stdout:
+                output.close()
+        if args.progress:
+            print(file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(cli_main())
     main()
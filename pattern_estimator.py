@@ -0,0 +1,342 @@
+"""Pattern-aware guess estimation in the spirit of zxcvbn.
+
+A password is scanned for dictionary words (including reversed and simple
+l33t spellings), keyboard walks, character sequences, repeats and dates.
+Each match gets a guess count, and a dynamic program picks the cheapest way
+to cover the password with matches and brute-forced characters. The result
+is an attacker's guess count rather than the character-pool entropy, which
+badly overrates passwords such as "Password123!".
+
+The dictionary is held as a set of words plus a set of all word prefixes,
+a hashed trie that lets the scan stop as soon as no word can continue. It
+is built once per word list and shared by every estimate.
+
+Only the first MAX_ESTIMATE_LENGTH characters are scanned, which keeps an
+estimate cheap enough for every keystroke and every /score request while
+still rating anything that long far beyond any attacker's budget.
+"""
+import math
+import re
+from dataclasses import dataclass
+from datetime import date
+
+import metrics
+
+MIN_WORD_LENGTH = 3
+MIN_MATCH_GUESSES = 10  # no pattern match is ever treated as cheaper than this
+MAX_ESTIMATE_LENGTH = 256  # longer passwords are estimated on this prefix
+REFERENCE_YEAR = date.today().year
+
+_L33T = str.maketrans({"4": "a", "@": "a", "8": "b", "(": "c", "3": "e", "6": "g", "1": "i",
+                       "!": "i", "|": "l", "0": "o", "$": "s", "5": "s", "7": "t", "+": "t", "2": "z"})
+
+_QWERTY_ROWS = (("`1234567890-=", "~!@#$%^&*()_+"),
+                ("qwertyuiop[]\\", "QWERTYUIOP{}|"),
+                ("asdfghjkl;'", 'ASDFGHJKL:"'),
+                ("zxcvbnm,./", "ZXCVBNM<>?"))
+_KEYPAD_ROWS = ("789", "456", "123", "0")
+
+_REPEAT = re.compile(r"(.+?)\1+")
+_DATE_WITH_SEPARATORS = re.compile(r"(\d{1,4})([\s/\\._-])(\d{1,2})\2(\d{1,4})")
+_DIGITS = re.compile(r"\d{4,8}")
+
+
+def _build_graph(rows, directions):
+    """(key -> (row, col), key -> neighbouring keys) for one keyboard layout."""
+    positions = {}
+    for r, row_variants in enumerate(rows):
+        for row in row_variants:
+            for c, key in enumerate(row):
+                positions[key] = (r, c)
+    by_position = {}
+    for key, pos in positions.items():
+        by_position.setdefault(pos, []).append(key)
+    adjacency = {}
+    for key, (r, c) in positions.items():
+        adjacency[key] = {other for dr, dc in directions for other in by_position.get((r + dr, c + dc), ())}
+    return positions, adjacency
+
+
+# Rows of a QWERTY keyboard are staggered, so only six neighbours touch each key
+_GRAPHS = (_build_graph(_QWERTY_ROWS, ((0, -1), (0, 1), (-1, 0), (-1, 1), (1, -1), (1, 0))),
+           _build_graph([(row,) for row in _KEYPAD_ROWS],
+                        [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]))
+_SHIFTED = set('~!@#$%^&*()_+{}|:"<>?ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+# Brute-force alphabet per character class: lowercase, uppercase, digit, anything else
+_CARDINALITY_TABLE = str.maketrans({**{chr(c): "l" for c in range(ord("a"), ord("z") + 1)},
+                                    **{chr(c): "u" for c in range(ord("A"), ord("Z") + 1)},
+                                    **{str(d): "d" for d in range(10)}})
+_DICTIONARY_RUNS = re.compile(r"[a-z'-]{%d,}" % MIN_WORD_LENGTH)
+
+
+@dataclass(frozen=True)
+class Match:
+    pattern: str
+    i: int
+    j: int  # inclusive end position
+    token: str
+    guesses: float
+
+
+@dataclass(frozen=True)
+class Estimate:
+    guesses: float
+    bits: float
+    sequence: tuple  # Matches covering the password; brute-forced runs are pattern "bruteforce"
+
+
+class PatternEstimator:
+    def __init__(self, words=()):
+        self.words = set()
+        self.prefixes = set()
+        for word in words:
+            word = word.lower()
+            if len(word) >= MIN_WORD_LENGTH:
+                self.words.add(word)
+                for end in range(1, len(word)):
+                    self.prefixes.add(word[:end])
+        self.max_word_length = max((len(w) for w in self.words), default=0)
+        # Word lists here are unranked, so every entry costs a full dictionary pass
+        self.dictionary_guesses = max(len(self.words), 1)
+
+    def dictionary_matches(self, password):
+        matches = []
+        lowered = password.lower()
+        variants = [("dictionary", lowered, 1)]
+        unleeted = lowered.translate(_L33T)
+        if unleeted != lowered:
+            substitutions = sum(1 for a, b in zip(lowered, unleeted) if a != b)
+            variants.append(("l33t", unleeted, 2 ** substitutions))
+        variants.append(("reversed", lowered[::-1], 2))
+
+        n = len(password)
+        words, prefixes, longest = self.words, self.prefixes, self.max_word_length
+        for pattern, text, factor in variants:
+            # Words only contain letters, hyphens and apostrophes, so only those runs are scanned
+            for run in _DICTIONARY_RUNS.finditer(text):
+                run_end = run.end()
+                for i in range(run.start(), run_end - MIN_WORD_LENGTH + 1):
+                    if text[i:i + MIN_WORD_LENGTH - 1] not in prefixes:
+                        continue
+                    for j in range(i + MIN_WORD_LENGTH, min(run_end, i + longest) + 1):
+                        piece = text[i:j]
+                        if piece in words:
+                            start, end = (n - j, n - i - 1) if pattern == "reversed" else (i, j - 1)
+                            token = password[start:end + 1]
+                            matches.append(Match(pattern, start, end, token,
+                                                 self.dictionary_guesses * factor * _case_variations(token)))
+                        if piece not in prefixes:
+                            break
+        return matches
+
+    @metrics.timed("pattern_estimate")
+    def estimate(self, password):
+        """Cheapest guess count for password over all pattern segmentations.
+
+        Guesses are inf once they pass the float range; bits stay exact.
+        """
+        password = password[:MAX_ESTIMATE_LENGTH]
+        n = len(password)
+        if not n:
+            return Estimate(1, 0.0, ())
+
+        matches = self.dictionary_matches(password)
+        matches += keyboard_matches(password)
+        matches += sequence_matches(password)
+        matches += repeat_matches(password, self)
+        matches += date_matches(password)
+
+        by_end = {}
+        for m in matches:
+            by_end.setdefault(m.j, []).append(m)
+
+        log_card = math.log2(bruteforce_cardinality(password))
+        # best[k]: (log2 guesses to cover password[:k], match ending there or None for brute force)
+        best = [(0.0, None)] + [(math.inf, None)] * n
+        for k in range(1, n + 1):
+            best[k] = (best[k - 1][0] + log_card, None)
+            for m in by_end.get(k - 1, ()):
+                bits = best[m.i][0] + math.log2(max(m.guesses, MIN_MATCH_GUESSES))
+                if bits < best[k][0]:
+                    best[k] = (bits, m)
+
+        sequence = []
+        k = n
+        while k > 0:
+            m = best[k][1]
+            if m is None:
+                # Walk back over the whole brute-forced run ending here
+                start = k - 1
+                while start > 0 and best[start][1] is None:
+                    start -= 1
+                sequence.append(Match("bruteforce", start, k - 1, password[start:k], _exp2(log_card * (k - start))))
+                k = start
+            else:
+                sequence.append(m)
+                k = m.i
+        bits = best[n][0]
+        return Estimate(_exp2(bits), bits, tuple(reversed(sequence)))
+
+
+def _exp2(bits):
+    """2 ** bits as a float, inf where that would overflow."""
+    return 2.0 ** bits if bits < 1024 else math.inf
+
+
+def bruteforce_cardinality(password):
+    classes = password.translate(_CARDINALITY_TABLE)
+    card = 0
+    if "l" in classes:
+        card += 26
+    if "u" in classes:
+        card += 26
+    if "d" in classes:
+        card += 10
+    if classes.strip("lud"):
+        card += 33
+    return max(card, 10)
+
+
+def _case_variations(token):
+    upper = sum(1 for c in token if c.isupper())
+    if not upper or token.isupper() or (upper == 1 and token[0].isupper()):
+        return 1 if not upper else 2
+    lower = sum(1 for c in token if c.islower())
+    return sum(math.comb(upper + lower, k) for k in range(1, min(upper, lower) + 1))
+
+
+def _keyboard_guesses(token, turns, starts, degree):
+    """zxcvbn's count of walks up to this length with at most this many turns."""
+    guesses = 0
+    for length in range(2, len(token) + 1):
+        for turn in range(1, min(turns, length - 1) + 1):
+            guesses += math.comb(length - 1, turn - 1) * starts * degree ** turn
+    shifted = sum(1 for c in token if c in _SHIFTED)
+    if shifted:
+        unshifted = len(token) - shifted
+        guesses *= 2 if not unshifted else sum(math.comb(len(token), k)
+                                                for k in range(1, min(shifted, unshifted) + 1))
+    return guesses
+
+
+def keyboard_matches(password):
+    """Runs of 3+ keys that are neighbours on a QWERTY keyboard or numeric keypad."""
+    matches = []
+    n = len(password)
+    for positions, adjacency in _GRAPHS:
+        starts = len(adjacency)
+        degree = sum(len(keys) for keys in adjacency.values()) / starts
+        i = 0
+        while i < n - 2:
+            j = i
+            turns = 0
+            direction = None
+            while j + 1 < n and password[j + 1] in adjacency.get(password[j], ()):
+                (r1, c1), (r2, c2) = positions[password[j]], positions[password[j + 1]]
+                if (r2 - r1, c2 - c1) != direction:
+                    turns += 1
+                    direction = (r2 - r1, c2 - c1)
+                j += 1
+            if j - i >= 2:
+                token = password[i:j + 1]
+                matches.append(Match("keyboard", i, j, token, _keyboard_guesses(token, turns, starts, degree)))
+                i = j
+            else:
+                i += 1
+    return matches
+
+
+def sequence_matches(password):
+    """Runs of 3+ characters stepping by the same +/-1 or +/-2, e.g. "abc", "9753"."""
+    matches = []
+    n = len(password)
+    i = 0
+    while i < n - 2:
+        delta = ord(password[i + 1]) - ord(password[i])
+        j = i + 1
+        while j + 1 < n and ord(password[j + 1]) - ord(password[j]) == delta:
+            j += 1
+        if j - i >= 2 and delta and abs(delta) <= 2:
+            token = password[i:j + 1]
+            first = token[0]
+            if first in "aAzZ019":
+                base = 4
+            elif first.isdigit():
+                base = 10
+            else:
+                base = 26
+            guesses = base * len(token) * (2 if delta < 0 else 1)
+            matches.append(Match("sequence", i, j, token, guesses))
+        # A rejected run (e.g. "aaaa") would be rejected again from every later start
+        i = j if j - i >= 2 else i + 1
+    return matches
+
+
+def repeat_matches(password, estimator):
+    """Repeated characters or blocks, e.g. "aaaa" or "abcabc"."""
+    matches = []
+    for m in _REPEAT.finditer(password):
+        if len(m.group(0)) < MIN_WORD_LENGTH:
+            continue
+        base = m.group(1)
+        repeats = len(m.group(0)) // len(base)
+        base_guesses = estimator.estimate(base).guesses if len(base) > 1 else bruteforce_cardinality(base)
+        matches.append(Match("repeat", m.start(), m.end() - 1, m.group(0), base_guesses * repeats))
+    return matches
+
+
+def _plausible_date(day, month, year):
+    if year < 100:
+        year += 2000 if year <= REFERENCE_YEAR % 100 else 1900
+    if not 1900 <= year <= REFERENCE_YEAR + 30:
+        return None
+    if 1 <= month <= 12 and 1 <= day <= 31:
+        return year
+    return None
+
+
+def _date_year(parts):
+    """Year of the first day/month/year reading of three digit strings, if any."""
+    a, b, c = parts
+    for day, month, year in ((a, b, c), (b, a, c), (c, b, a), (b, c, a)):
+        if len(year) not in (2, 4) or len(day) > 2 or len(month) > 2:
+            continue
+        year = _plausible_date(int(day), int(month), int(year))
+        if year is not None:
+            return year
+    return None
+
+
+def _date_guesses(year, separator):
+    return 365 * max(abs(year - REFERENCE_YEAR), 20) * (4 if separator else 1)
+
+
+def date_matches(password):
+    """Calendar dates with or without separators, and bare years."""
+    matches = []
+    for m in _DATE_WITH_SEPARATORS.finditer(password):
+        year = _date_year((m.group(1), m.group(3), m.group(4)))
+        if year is not None:
+            matches.append(Match("date", m.start(), m.end() - 1, m.group(0), _date_guesses(year, True)))
+
+    for m in _DIGITS.finditer(password):
+        digits = m.group(0)
+        for i in range(len(digits) - 3):
+            for length in range(4, min(8, len(digits) - i) + 1):
+                token = digits[i:i + length]
+                start, end = m.start() + i, m.start() + i + length - 1
+                if length == 4 and 1900 <= int(token) <= REFERENCE_YEAR + 30:
+                    matches.append(Match("year", start, end, token, max(abs(int(token) - REFERENCE_YEAR), 20)))
+                    continue
+                year = None
+                for split1 in range(1, length - 1):
+                    for split2 in range(split1 + 1, length):
+                        year = _date_year((token[:split1], token[split1:split2], token[split2:]))
+                        if year is not None:
+                            break
+                    if year is not None:
+                        break
+                if year is not None:
+                    matches.append(Match("date", start, end, token, _date_guesses(year, False)))
+    return matches
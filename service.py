@@ -0,0 +1,291 @@
+"""Local HTTP generation service.
+
+A small asyncio HTTP/1.1 server (TCP or Unix socket) exposing the generator
+to provisioning systems:
+
+    GET/POST /generate     random passwords      (length, count, upper, lower, digits,
+                                                  symbols, shuffle, exclude, min_symbols)
+    GET/POST /passphrase   passphrases           (same options plus min_words and wordlist,
+                                                  the name of a list such as a language)
+    POST     /score        strength report       ({"password": ...} in the body, at most
+                                                  MAX_SCORE_LENGTH characters)
+    GET      /threat       current threat snapshot and 1/7/30 day breach totals
+    GET      /metrics      counters and latency histograms as Prometheus text
+                           (format=json for a JSON snapshot), when started with metrics
+    GET      /health
+
+Generation requests may name a tenant=<policy> from the service's policy
+file; the request's own options then override that policy's fields.
+
+Connections are kept alive between requests. Every client shares one warm
+index per word list, one pattern estimator and one background ThreatFeed.
+Password requests that arrive together for the same policy are served from a
+single CSPRNG batch draw, using the policy's cached GenerationPlan.
+"""
+import asyncio
+import json
+from dataclasses import asdict, replace
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+from password_engine import PasswordPolicy, generate_password_batch, generate_passphrase
+from pattern_estimator import PatternEstimator
+from strength import evaluate_password
+from threat_feed import ThreatFeed
+from word_index import discover_word_lists
+
+MAX_COUNT = 10_000  # per request
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+PASSPHRASE_SLICE = 64  # passphrases generated between yields to the event loop
+MAX_SCORE_LENGTH = 1024  # characters; /score runs the estimator on the event loop
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class PasswordBatcher:
+    """Coalesces concurrent requests for the same policy into one batch draw."""
+
+    def __init__(self, reject=None, max_delay=0.001):
+        self.reject = reject
+        self.max_delay = max_delay
+        self.batches = 0
+        self._pending = {}  # policy -> [(count, future)]
+
+    async def generate(self, policy, count):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiting = self._pending.setdefault(policy, [])
+        waiting.append((count, future))
+        if len(waiting) == 1:
+            loop.call_later(self.max_delay, self._flush, policy)
+        return await future
+
+    def _flush(self, policy):
+        waiting = self._pending.pop(policy)
+        self.batches += 1
+        try:
+            passwords = generate_password_batch(policy, sum(count for count, _ in waiting), self.reject)
+        except Exception as e:
+            # Every waiting request must be answered, whatever went wrong
+            error = HTTPError(400 if isinstance(e, ValueError) else 500, str(e))
+            for _, future in waiting:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        start = 0
+        for count, future in waiting:
+            if not future.done():
+                future.set_result(passwords[start:start + count])
+            start += count
+
+
+def _flag(params, name, default):
+    value = params.get(name, default)
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _number(params, name, default, low, high):
+    """params[name] as an int within [low, high]; default (unchecked) when it is absent."""
+    if name not in params:
+        return default
+    try:
+        value = int(params[name])
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"'{name}' must be an integer")
+    if not low <= value <= high:
+        raise HTTPError(400, f"'{name}' must be between {low} and {high}")
+    return value
+
+
+class GenerationService:
+    def __init__(self, wordlist="wordlist.txt", threat_feed=None, pwned_store=None, wordlist_dir="wordlists",
+                 policies=None):
+        self.word_lists = discover_word_lists(wordlist, wordlist_dir)
+        self.word_index = self.word_lists.get("default")
+        self.estimator = PatternEstimator(self.word_index.words)
+        self.threat_feed = threat_feed or ThreatFeed()
+        self.pwned_store = pwned_store
+        self.policies = policies or {}  # tenant name -> PasswordPolicy
+        self.batcher = PasswordBatcher(pwned_store.is_pwned if pwned_store else None)
+        self.requests = 0
+
+    def word_index_for(self, params):
+        try:
+            return self.word_lists.get(str(params.get("wordlist", "default")))
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+    def policy_from(self, params):
+        """Policy for a request, raised to the current threat minimums like the GUI."""
+        base = PasswordPolicy()
+        if "tenant" in params:
+            base = self.policies.get(str(params["tenant"]))
+            if base is None:
+                raise HTTPError(400, f"Unknown tenant '{params['tenant']}'")
+        policy = replace(base, length=_number(params, "length", base.length, 4, 128),
+                         upper=_flag(params, "upper", base.upper),
+                         lower=_flag(params, "lower", base.lower),
+                         digits=_flag(params, "digits", base.digits),
+                         symbols=_flag(params, "symbols", base.symbols),
+                         shuffle=_flag(params, "shuffle", base.shuffle),
+                         exclude=str(params.get("exclude", base.exclude)),
+                         min_symbols=_number(params, "min_symbols", base.min_symbols, 0, 64),
+                         min_words=_number(params, "min_words", base.min_words, 1, 32))
+        return policy.with_threat(self.threat_feed.snapshot)
+
+    async def dispatch(self, method, path, params):
+        self.requests += 1
+        if path == "/health":
+            return {"status": "ok"}
+        if path == "/metrics":
+            if not metrics.enabled:
+                raise HTTPError(404, "Metrics are disabled; start the service with --metrics")
+            if params.get("format") == "json":
+                return metrics.METRICS.snapshot()
+            return metrics.METRICS.prometheus()
+        if path == "/threat":
+            snapshot = self.threat_feed.snapshot
+            windows = {f"{days}d": dict(zip(("accounts", "password_breaches", "email_breaches"),
+                                             self.threat_feed.window(days)))
+                       for days in (1, 7, 30)}
+            return {**asdict(snapshot), "stale": self.threat_feed.is_stale(), "windows": windows}
+        if path in ("/generate", "/passphrase"):
+            if method not in ("GET", "POST"):
+                raise HTTPError(405, "Use GET or POST")
+            policy = self.policy_from(params)
+            count = _number(params, "count", 1, 1, MAX_COUNT)
+            if path == "/generate":
+                passwords = await self.batcher.generate(policy, count)
+            else:
+                passwords = await self.passphrases(policy, self.word_index_for(params), count)
+            return {"passwords": passwords, "threat_level": self.threat_feed.snapshot.level}
+        if path == "/score":
+            if method != "POST":
+                raise HTTPError(405, "Send the password in a POST body")
+            password = params.get("password")
+            if not isinstance(password, str):
+                raise HTTPError(400, "'password' is required")
+            if len(password) > MAX_SCORE_LENGTH:
+                raise HTTPError(400, f"'password' must be at most {MAX_SCORE_LENGTH} characters")
+            passphrase = _flag(params, "passphrase", False)
+            pwned = bool(self.pwned_store and self.pwned_store.is_pwned(password))
+            pool = self.word_index_for(params).pool_size(str(params.get("exclude", "")))
+            report = evaluate_password(password, self.threat_feed.snapshot, passphrase, pool, pwned,
+                                       self.estimator)
+            return {**asdict(report), "meets_policy": report.meets_policy}
+        raise HTTPError(404, f"No endpoint {path}")
+
+    async def passphrases(self, policy, word_index, count):
+        """count passphrases, yielding to other clients every PASSPHRASE_SLICE of them."""
+        reject = self.pwned_store.is_pwned if self.pwned_store else None
+        passwords = []
+        try:
+            while len(passwords) < count:
+                passwords.extend(generate_passphrase(policy, word_index, reject)
+                                 for _ in range(min(PASSPHRASE_SLICE, count - len(passwords))))
+                if len(passwords) < count:
+                    await asyncio.sleep(0)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        return passwords
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, {"error": "Headers too large"}, False)
+                    break
+                keep_alive = await self._handle_request(head, reader, writer)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def _handle_request(self, head, reader, writer):
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            await self._respond(writer, 400, {"error": "Malformed request line"}, False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            await self._respond(writer, 400, {"error": "Invalid Content-Length"}, False)
+            return False
+        if length > MAX_BODY_BYTES:
+            await self._respond(writer, 413, {"error": "Body too large"}, False)
+            return False
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            if body:
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    raise HTTPError(400, "Body must be JSON")
+                if not isinstance(payload, dict):
+                    raise HTTPError(400, "Body must be a JSON object")
+                params.update(payload)
+            with metrics.timer("http_request"):
+                status, result = 200, await self.dispatch(method, url.path, params)
+        except HTTPError as e:
+            status, result = e.status, {"error": str(e)}
+            metrics.count("http_errors")
+        except Exception as e:  # e.g. an unreadable word list; answer rather than drop the connection
+            status, result = 500, {"error": str(e)}
+            metrics.count("http_errors")
+        await self._respond(writer, status, result, keep_alive)
+        return keep_alive
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        """Send payload as JSON, or as plain text if it is already a string."""
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode('utf-8'), "application/json"
+        writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+                     f"Content-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body)
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=8080, unix_socket=None):
+        """Start listening and return the asyncio server."""
+        self.threat_feed.start()
+        generate_password_batch(PasswordPolicy(), 1)  # pay one-off imports before the first request
+        if unix_socket:
+            return await asyncio.start_unix_server(self.handle_connection, unix_socket, limit=MAX_HEADER_BYTES)
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+
+async def serve(service, host="127.0.0.1", port=8080, unix_socket=None):
+    server = await service.start(host, port, unix_socket)
+    async with server:
+        await server.serve_forever()
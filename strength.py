@@ -0,0 +1,158 @@
+"""Password strength scoring shared by the GUI tester and bulk audits.
+
+Everything here is a pure function of the password, the current threat
+snapshot and the passphrase settings, so it can run without Tk and in
+worker processes. Character classes are counted with one translate through
+a lookup table instead of a separate scan per class, and an optional
+PatternEstimator caps the score at the password's realistic guess count.
+"""
+import math
+import re
+import string
+from dataclasses import dataclass
+
+import metrics
+from threat_feed import ThreatSnapshot
+
+# Trends that also require uppercase letters and digits
+ELEVATED_TRENDS = ("Urgent Password Leaks", "Email/Password Exposure")
+_WORD_SEPARATORS = re.compile(r"[-!@#$%^&*0-9]")
+_SEPARATOR_CHARS = frozenset("-!@#$%^&*0123456789")
+_WORD = re.compile(r"[^\W\d_]+(?:['-][^\W\d_]+)*")  # letters, with inner hyphens/apostrophes ("High-speed")
+
+# ASCII character -> class letter; anything else is left alone and classified by hand
+_CLASS_TABLE = str.maketrans({**{c: "U" for c in string.ascii_uppercase},
+                              **{c: "L" for c in string.ascii_lowercase},
+                              **{c: "D" for c in string.digits},
+                              **{c: "S" for c in string.punctuation}})
+_POOL_SIZES = (26, 26, 10, 32)  # uppercase, lowercase, digits, symbols
+
+
+@dataclass(frozen=True)
+class StrengthReport:
+    length: int
+    has_upper: bool
+    has_lower: bool
+    has_digit: bool
+    num_symbols: int
+    num_words: int
+    entropy: float
+    score: int
+    strength: str
+    suggestions: tuple
+    pwned: bool = False
+    guess_bits: float = None  # log2 of the pattern-aware guess estimate, if one was made
+
+    @property
+    def meets_policy(self):
+        return not self.suggestions
+
+
+def count_words(password):
+    """Words of a passphrase, split on the one separator character that joins them.
+
+    Word lists contain hyphenated entries, so each separator character in the
+    password is tried and the split leaving only whole words, with the fewest
+    of them, wins. Otherwise words are counted between any non-hyphen separators.
+    """
+    best = None
+    for separator in _SEPARATOR_CHARS.intersection(password):
+        pieces = password.split(separator)
+        if all(_WORD.fullmatch(piece) for piece in pieces) and (best is None or len(pieces) < best):
+            best = len(pieces)
+    if best is not None:
+        return best
+    return sum(1 for piece in re.split(r"[!@#$%^&*0-9]", password) if _WORD.fullmatch(piece))
+
+
+def classify(password):
+    """(uppercase, lowercase, digits, symbols) counts from a single pass over the password."""
+    if password.isascii():
+        classes = password.translate(_CLASS_TABLE)
+        return classes.count("U"), classes.count("L"), classes.count("D"), classes.count("S")
+    upper = lower = digits = symbols = 0
+    for c in password:
+        if c.isupper():
+            upper += 1
+        elif c.islower():
+            lower += 1
+        elif c.isdigit():
+            digits += 1
+        elif c in string.punctuation:
+            symbols += 1
+    return upper, lower, digits, symbols
+
+
+def character_pool(password, counts=None):
+    counts = counts or classify(password)
+    return sum(size for size, count in zip(_POOL_SIZES, counts) if count)
+
+
+def calculate_entropy(password, passphrase=False, word_list_size=0, counts=None):
+    """Bits of entropy by character pool, or by word list size for passphrases."""
+    if not password:
+        return 0.0
+
+    if passphrase and _WORD_SEPARATORS.search(password):
+        entropy = count_words(password) * math.log2(max(word_list_size, 1))
+    else:
+        entropy = len(password) * math.log2(max(character_pool(password, counts), 1))
+
+    return round(entropy, 2)
+
+
+def strength_label(score):
+    if score >= 90:
+        return "Very Strong"
+    elif score >= 70:
+        return "Strong"
+    elif score >= 50:
+        return "Moderate"
+    return "Weak"
+
+
+@metrics.timed("evaluate_password")
+def evaluate_password(password, threat=ThreatSnapshot(), passphrase=False, word_list_size=0, pwned=False,
+                      estimator=None):
+    """Score a password and list what it lacks under the threat snapshot's minimums.
+
+    With a PatternEstimator the score uses whichever is lower of the entropy
+    and the bits needed to guess the password's dictionary words, keyboard
+    walks, sequences, repeats and dates.
+    """
+    length = len(password)
+    counts = classify(password)
+    upper, lower, digits, num_symbols = counts
+    has_upper, has_lower, has_digit = upper > 0, lower > 0, digits > 0
+    num_words = count_words(password) if passphrase else 0
+
+    if passphrase:
+        entropy = num_words * math.log2(max(word_list_size, 1))
+    else:
+        entropy = length * math.log2(max(character_pool(password, counts), 1))
+    guess_bits = None
+    if estimator is not None and password:
+        guess_bits = round(estimator.estimate(password).bits, 2)
+        entropy = min(entropy, guess_bits)
+    score = min(100, int(entropy * 2))
+
+    # Granular feedback
+    feedback = []
+    if pwned:
+        feedback.append("Found in known password breaches; do not use it.")
+    if length < threat.min_length:
+        feedback.append(f"Add {threat.min_length - length} chars to reach {threat.min_length}.")
+    if threat.trend in ELEVATED_TRENDS and not has_upper:
+        feedback.append("Add 1+ uppercase letters.")
+    if threat.trend in ELEVATED_TRENDS and not has_digit:
+        feedback.append("Add 1+ digits.")
+    if num_symbols < threat.min_symbols:
+        feedback.append(f"Add {threat.min_symbols - num_symbols} more symbols.")
+    if passphrase and num_words < threat.min_words:
+        feedback.append(f"Add {threat.min_words - num_words} more words to reach {threat.min_words}.")
+
+    return StrengthReport(length=length, has_upper=has_upper, has_lower=has_lower, has_digit=has_digit,
+                          num_symbols=num_symbols, num_words=num_words,
+                          entropy=calculate_entropy(password, passphrase, word_list_size, counts),
+                          score=score, strength=strength_label(score), suggestions=tuple(feedback),
+                          pwned=pwned, guess_bits=guess_bits)
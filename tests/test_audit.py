@@ -0,0 +1,33 @@
+import io
+import os
+
+import pytest
+
+from audit import iter_chunks, run_audit
+from threat_feed import ThreatSnapshot
+
+WORDLIST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wordlist.txt")
+
+
+def test_blank_lines_are_skipped_and_numbering_kept():
+    lines = ["password\n", "\n", "zX8#qL2!vN5\r\n", "", "qwerty\n"]
+    assert list(iter_chunks(lines, 2)) == [[(1, "password"), (3, "zX8#qL2!vN5")], [(5, "qwerty")]]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_report_rows(workers):
+    report = io.StringIO()
+    summary = run_audit(["password\n", "\n", "zX8#qL2!vN5$wR9@\n"], report, ThreatSnapshot(),
+                        workers=workers, chunk_size=1, wordlist=WORDLIST)
+    rows = report.getvalue().splitlines()
+    assert [row.split(",")[0] for row in rows] == ["line", "1", "3"]
+    assert summary["passwords"] == 2
+    assert "0" not in summary["length"]
+
+
+@pytest.mark.parametrize("options", [{"wordlist": "missing.txt"}, {"wordlist": WORDLIST, "pwned_store": "missing.bin"}])
+def test_missing_files_fail_before_workers_start(options):
+    report = io.StringIO()
+    with pytest.raises(OSError):
+        run_audit(["password\n"], report, ThreatSnapshot(), workers=2, **options)
+    assert report.getvalue() == ""
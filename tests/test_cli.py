@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from password_engine import PasswordPolicy
+from password_generator import build_cli_parser, policy_from_args
+
+
+@pytest.fixture
+def policy_file(tmp_path):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps({"defaults": {"length": 16},
+                                "globex": {"length": 24, "symbols": False, "min_symbols": 0, "exclude": "0O"}}))
+    return str(path)
+
+
+def parse(*argv):
+    return policy_from_args(build_cli_parser().parse_args(["generate", *argv]))
+
+
+def test_defaults_without_tenant():
+    assert parse() == PasswordPolicy()
+    assert parse("--no-digits", "-l", "20") == PasswordPolicy(length=20, digits=False)
+
+
+def test_tenant_values_survive_unless_given(policy_file):
+    tenant = parse("--policy-file", policy_file, "--tenant", "globex")
+    assert (tenant.length, tenant.symbols, tenant.exclude) == (24, False, "0O")
+
+
+def test_command_line_values_equal_to_defaults_still_override(policy_file):
+    policy = parse("--policy-file", policy_file, "--tenant", "globex",
+                   "-l", "12", "--symbols", "--exclude", "", "--min-words", "3")
+    assert (policy.length, policy.symbols, policy.exclude, policy.min_words) == (12, True, "", 3)
+    assert not parse("--policy-file", policy_file, "--tenant", "globex", "--no-upper").upper
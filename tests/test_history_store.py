@@ -0,0 +1,136 @@
+import os
+
+import pytest
+
+from history_store import (FRAME_AAD, FRAME_LENGTH, LOG_HEADER, EncryptedLog, HistoryRing, _HMACSHA256,
+                           load_key, open_history_log)
+
+KEY = bytes(range(32))
+
+
+def test_round_trip_and_range_query(tmp_path):
+    path = str(tmp_path / "passwords.log")
+    with EncryptedLog(path, KEY) as log:
+        for i in range(1_000):
+            log.append(f"password-{i}", timestamp=1_000_000.0 + i)
+
+    with EncryptedLog(path, KEY) as log:
+        assert len(log) == 1_000
+        entries = list(log)
+        assert [e.password for e in entries] == [f"password-{i}" for i in range(1_000)]
+        assert [e.sequence for e in entries] == list(range(1_000))
+        window = [e.password for e in log.entries(1_000_500.0, 1_000_509.0)]
+        assert window == [f"password-{i}" for i in range(500, 510)]
+        log.append("after reopen")
+    with EncryptedLog(path, KEY) as log:
+        assert list(log)[-1].password == "after reopen"
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    path = str(tmp_path / "passwords.log")
+    with EncryptedLog(path, KEY) as log:
+        log.extend(["one", "two", "three"])
+    intact = os.path.getsize(path)
+    with open(path, 'ab') as file:
+        file.write(FRAME_LENGTH.pack(64) + FRAME_AAD.pack(2e9, 3) + b"partial")  # crash mid-write
+
+    with EncryptedLog(path, KEY) as log:
+        assert os.path.getsize(path) == intact
+        assert [e.password for e in log] == ["one", "two", "three"]
+        log.append("four")
+    with EncryptedLog(path, KEY) as log:
+        assert [e.password for e in log] == ["one", "two", "three", "four"]
+
+
+def test_tampered_entry_is_detected(tmp_path):
+    path = str(tmp_path / "passwords.log")
+    with EncryptedLog(path, KEY) as log:
+        log.extend(["one", "two"])
+    with open(path, 'r+b') as file:
+        file.seek(-1, os.SEEK_END)
+        last = file.read(1)
+        file.seek(-1, os.SEEK_END)
+        file.write(bytes([last[0] ^ 1]))
+
+    with EncryptedLog(path, KEY) as log:
+        entries = log.entries()
+        assert next(entries).password == "one"
+        with pytest.raises(ValueError, match="authentication"):
+            next(entries)
+
+
+def test_dropped_entry_is_detected(tmp_path):
+    path = str(tmp_path / "passwords.log")
+    with EncryptedLog(path, KEY) as log:
+        log.extend(["one", "two", "three"])
+    with open(path, 'rb') as file:
+        data = file.read()
+    first = LOG_HEADER.size
+    length, = FRAME_LENGTH.unpack_from(data, first)
+    second = first + FRAME_LENGTH.size + FRAME_AAD.size + length
+    with open(path, 'wb') as file:
+        file.write(data[:first] + data[second:])  # remove the first entry
+    with pytest.raises(ValueError, match="missing entries"):
+        EncryptedLog(path, KEY)
+
+
+def test_wrong_key(tmp_path):
+    path = str(tmp_path / "passwords.log")
+    EncryptedLog(path, KEY).close()
+    with pytest.raises(ValueError, match="Wrong key"):
+        EncryptedLog(path, bytes(32))
+
+
+@pytest.mark.parametrize("size", [0, 1, 31, 32, 33, 100])
+def test_hmac_cipher_round_trip(size):
+    cipher = _HMACSHA256(KEY)
+    nonce, aad, data = bytes(12), b"header", os.urandom(size)
+    sealed = cipher.encrypt(nonce, data, aad)
+    assert len(sealed) == size + 16
+    assert size < 8 or sealed[:size] != data
+    assert cipher.decrypt(nonce, sealed, aad) == data
+    assert _HMACSHA256(KEY).decrypt(nonce, sealed, aad) == data
+
+
+def test_hmac_cipher_detects_tampering():
+    cipher = _HMACSHA256(KEY)
+    nonce, aad = bytes(12), b"header"
+    sealed = cipher.encrypt(nonce, b"correct horse battery staple", aad)
+    for i in (0, len(sealed) // 2, len(sealed) - 1):  # body and tag bytes
+        tampered = bytearray(sealed)
+        tampered[i] ^= 1
+        with pytest.raises(ValueError, match="authentication"):
+            cipher.decrypt(nonce, bytes(tampered), aad)
+    with pytest.raises(ValueError, match="authentication"):
+        cipher.decrypt(nonce, sealed, b"other header")
+    with pytest.raises(ValueError, match="authentication"):
+        cipher.decrypt(b"\x01" + bytes(11), sealed, aad)
+
+
+def test_hmac_cipher_wrong_key():
+    nonce, aad = bytes(12), b"header"
+    sealed = _HMACSHA256(KEY).encrypt(nonce, b"secret", aad)
+    with pytest.raises(ValueError, match="authentication"):
+        _HMACSHA256(bytes(32)).decrypt(nonce, sealed, aad)
+
+
+def test_key_is_only_created_for_a_new_log(tmp_path):
+    path = str(tmp_path / "passwords.log")
+    with pytest.raises(FileNotFoundError):
+        load_key(f"{path}.key")
+    with open_history_log(path) as log:
+        log.append("one")
+    assert os.stat(f"{path}.key").st_mode & 0o777 == 0o600
+    with open_history_log(path) as log:
+        assert [e.password for e in log] == ["one"]
+
+    os.remove(f"{path}.key")
+    with pytest.raises(FileNotFoundError, match="No history key"):
+        open_history_log(path)
+    assert not os.path.exists(f"{path}.key")
+
+
+def test_history_ring_evicts_oldest():
+    ring = HistoryRing(3)
+    assert [ring.append(p) for p in "abcd"] == [None, None, None, "a"]
+    assert list(ring) == ["d", "c", "b"]
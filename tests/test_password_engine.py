@@ -0,0 +1,83 @@
+import string
+
+import pytest
+
+import password_engine
+from password_engine import PasswordPolicy, generate_password, generate_password_batch
+
+POLICIES = [
+    PasswordPolicy(),
+    PasswordPolicy(length=4),
+    PasswordPolicy(length=32, min_symbols=3),
+    PasswordPolicy(length=16, shuffle=False, min_upper=2, min_digits=3),
+    PasswordPolicy(length=20, symbols=False, exclude="lI1O0o"),
+    PasswordPolicy(length=12, upper=False, digits=False, exclude="aeiou"),
+    PasswordPolicy(length=24, lower=False, symbols=False),
+    PasswordPolicy(length=16, exclude=string.punctuation.replace("#", "")),
+]
+CLASSES = (("upper", "min_upper", string.ascii_uppercase), ("lower", "min_lower", string.ascii_lowercase),
+           ("digits", "min_digits", string.digits), ("symbols", "min_symbols", string.punctuation))
+
+
+def check(policy, password):
+    assert len(password) == max(policy.length, sum(
+        getattr(policy, minimum) for enabled, minimum, _ in CLASSES if getattr(policy, enabled)))
+    assert not set(password) & set(policy.exclude)
+    for enabled, minimum, chars in CLASSES:
+        count = sum(1 for c in password if c in chars)
+        if getattr(policy, enabled):
+            assert count >= getattr(policy, minimum), (policy, password)
+        else:
+            assert count == 0, (policy, password)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def batch_path(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(password_engine, "optional_import", lambda name: None)
+    return request.param
+
+
+@pytest.mark.parametrize("policy", POLICIES)
+def test_single_passwords_honour_policy(policy):
+    for _ in range(200):
+        check(policy, generate_password(policy))
+
+
+@pytest.mark.parametrize("policy", POLICIES)
+def test_batches_honour_policy(policy, batch_path):
+    passwords = generate_password_batch(policy, 500)
+    assert len(passwords) == 500
+    for password in passwords:
+        check(policy, password)
+
+
+def test_batch_rejects_are_regenerated(batch_path):
+    banned = set()
+
+    def reject(password):
+        if len(banned) < 50:
+            banned.add(password)
+            return True
+        return password in banned
+
+    passwords = generate_password_batch(PasswordPolicy(length=8), 100, reject)
+    assert len(passwords) == 100
+    assert not banned & set(passwords)
+
+
+def test_no_characters_left():
+    policy = PasswordPolicy(upper=False, lower=False, digits=False, symbols=False)
+    with pytest.raises(ValueError):
+        generate_password(policy)
+    with pytest.raises(ValueError):
+        generate_password_batch(policy, 10)
+
+
+def test_threat_minimums_raise_the_policy():
+    from threat_feed import ThreatSnapshot
+    policy = PasswordPolicy(length=12).with_threat(ThreatSnapshot(level="High", min_length=20, min_symbols=3))
+    assert (policy.length, policy.min_symbols, policy.threat_level) == (20, 3, "High")
+    check(policy, generate_password(policy))
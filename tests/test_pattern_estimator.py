@@ -0,0 +1,82 @@
+import math
+import os
+import secrets
+import string
+import time
+
+import pytest
+
+from pattern_estimator import MAX_ESTIMATE_LENGTH, Estimate, PatternEstimator, sequence_matches
+from strength import evaluate_password
+from threat_feed import ThreatSnapshot
+
+WORDLIST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wordlist.txt")
+
+
+@pytest.fixture(scope="module")
+def estimator():
+    with open(WORDLIST) as file:
+        return PatternEstimator(line.strip() for line in file)
+
+
+@pytest.mark.parametrize("password, patterns, bits", [
+    ("Password123!", ["dictionary", "sequence", "bruteforce"], 26.5),
+    ("qwertyuiop", ["keyboard"], 13.0),
+    ("zxcvbn", ["keyboard"], 12.1),
+    ("abcdefgh", ["sequence"], 5.0),
+    ("97531", ["sequence"], 5.3),
+    ("abcabcabcabc", ["repeat"], 5.6),
+    ("aaaaaaaaaaaa", ["repeat"], 8.3),
+    ("drowssap", ["reversed"], 16.3),
+    ("p4ssw0rd", ["l33t"], 17.3),
+    ("correcthorsebatterystaple", ["dictionary"] * 4, 61.3),
+    ("kX9#mQ2$vL7@", ["bruteforce"], 78.8),
+])
+def test_estimates(estimator, password, patterns, bits):
+    estimate = estimator.estimate(password)
+    assert [m.pattern for m in estimate.sequence] == patterns
+    assert "".join(m.token for m in estimate.sequence) == password
+    assert estimate.bits == pytest.approx(bits, abs=0.1)
+    assert estimate.guesses == pytest.approx(2 ** estimate.bits)
+
+
+@pytest.mark.parametrize("password", ["1987-06-05", "05/06/87", "05061987"])
+def test_dates(estimator, password):
+    estimate = estimator.estimate(password)
+    assert [m.pattern for m in estimate.sequence] == ["date"]
+    assert estimate.bits < 20
+
+
+def test_password123_scores_as_its_pattern_bits(estimator):
+    """The README's example: ~26 bits rather than the ~78 of its character pool."""
+    assert evaluate_password("Password123!", ThreatSnapshot()).entropy == pytest.approx(78, abs=1)
+    report = evaluate_password("Password123!", ThreatSnapshot(), estimator=estimator)
+    assert report.guess_bits == pytest.approx(26, abs=1)
+    assert report.score == int(report.guess_bits * 2)
+
+
+def test_empty_password(estimator):
+    assert estimator.estimate("") == Estimate(1, 0.0, ())
+
+
+def test_long_random_password_does_not_overflow(estimator):
+    password = "".join(secrets.choice(string.ascii_letters + string.digits + string.punctuation) for _ in range(500))
+    estimate = estimator.estimate(password)
+    assert estimate.guesses == math.inf
+    assert 1024 < estimate.bits < math.inf
+    assert all(m.guesses > 0 for m in estimate.sequence)
+    report = evaluate_password(password, ThreatSnapshot(), estimator=estimator)
+    assert report.guess_bits == round(estimate.bits, 2)
+
+
+@pytest.mark.parametrize("password", ["a" * 20_000, "ab" * 10_000, secrets.token_hex(32_768)])
+def test_long_inputs_are_linear(estimator, password):
+    started = time.perf_counter()
+    estimator.estimate(password)
+    sequence_matches(password)
+    assert time.perf_counter() - started < 1.0
+
+
+def test_only_the_prefix_is_scanned(estimator):
+    password = "x9#" * 1_000
+    assert estimator.estimate(password) == estimator.estimate(password[:MAX_ESTIMATE_LENGTH])
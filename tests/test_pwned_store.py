@@ -0,0 +1,70 @@
+import hashlib
+import os
+
+import pytest
+
+from pwned_store import PwnedStore, build_store, iter_hash_file, iter_range_directory, open_pwned_store
+
+BREACHED = ["password", "123456", "qwerty", "letmein", "dragon", "Password123!", "correct horse"]
+CLEAN = ["zX8#qL2!vN5$wR9@", "Drub7orderliness7Fetish", "not-in-the-corpus"]
+
+
+def sha1(password):
+    return hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
+
+
+def test_hits_and_misses(tmp_path):
+    path = str(tmp_path / "pwned.bin")
+    assert build_store(sorted(sha1(p) for p in BREACHED), path) == len(BREACHED)
+    store = PwnedStore(path)
+    try:
+        assert len(store) == len(BREACHED)
+        assert all(store.is_pwned(p) for p in BREACHED)
+        assert not any(store.is_pwned(p) for p in CLEAN)
+        assert store.contains_sha1(sha1("dragon").lower())
+    finally:
+        store.close()
+
+
+def test_out_of_order_input_is_rejected(tmp_path):
+    hashes = sorted(sha1(p) for p in BREACHED)
+    hashes[0], hashes[-1] = hashes[-1], hashes[0]
+    with pytest.raises(ValueError, match="sorted"):
+        build_store(hashes, str(tmp_path / "pwned.bin"))
+    assert os.listdir(tmp_path) == []  # neither the store nor its partial .tmp file
+
+
+def test_duplicates_are_written_once(tmp_path):
+    hashes = sorted(sha1(p) for p in BREACHED)
+    assert build_store(hashes + hashes[-1:], str(tmp_path / "pwned.bin")) == len(BREACHED)
+
+
+def test_hash_file_with_min_count(tmp_path):
+    source = tmp_path / "ordered.txt"
+    source.write_text("".join(f"{sha1(p)}:{i + 1}\n" for i, p in enumerate(sorted(BREACHED, key=sha1))))
+    path = str(tmp_path / "pwned.bin")
+    assert build_store(iter_hash_file(str(source), min_count=3), path) == len(BREACHED) - 2
+
+
+def test_range_directory(tmp_path):
+    ranges = tmp_path / "ranges"
+    ranges.mkdir()
+    by_prefix = {}
+    for password in BREACHED:
+        digest = sha1(password)
+        by_prefix.setdefault(digest[:5], []).append(f"{digest[5:]}:10\n")
+    for prefix, lines in by_prefix.items():
+        (ranges / f"{prefix}.txt").write_text("".join(sorted(lines)))
+
+    path = str(tmp_path / "pwned.bin")
+    assert build_store(iter_range_directory(str(ranges)), path) == len(BREACHED)
+    store = PwnedStore(path)
+    try:
+        assert all(store.is_pwned(p) for p in BREACHED)
+        assert not any(store.is_pwned(p) for p in CLEAN)
+    finally:
+        store.close()
+
+
+def test_missing_store_is_optional(tmp_path):
+    assert open_pwned_store(str(tmp_path / "missing.bin")) is None
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+import secrets
+
+import pytest
+
+from password_engine import PasswordPolicy
+from service import MAX_SCORE_LENGTH, GenerationService, HTTPError, PasswordBatcher
+from threat_feed import ThreatFeed
+
+WORDLIST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wordlist.txt")
+
+
+@pytest.fixture
+def service(tmp_path):
+    feed = ThreatFeed(cache_file=str(tmp_path / "threat_cache.json"), url="http://127.0.0.1:9/")
+    return GenerationService(WORDLIST, feed, wordlist_dir=str(tmp_path),
+                             policies={"long": PasswordPolicy(length=200, symbols=False)})
+
+
+async def exchange(service, raw):
+    server = await service.start(port=0)
+    host, port = server.sockets[0].getsockname()[:2]
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(raw)
+        head = await reader.readuntil(b"\r\n\r\n")
+        body = await reader.read()
+        writer.close()
+        return int(head.split(b" ")[1]), json.loads(body)
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.threat_feed.stop()
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-5"])
+def test_invalid_content_length(service, length):
+    raw = b"POST /score HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n"
+    status, body = asyncio.run(exchange(service, raw))
+    assert status == 400
+    assert "Content-Length" in body["error"]
+
+
+def test_tenant_defaults_are_not_bounds_checked(service):
+    result = asyncio.run(service.dispatch("GET", "/generate", {"tenant": "long", "count": "2"}))
+    assert [len(p) for p in result["passwords"]] == [200, 200]
+    with pytest.raises(HTTPError):
+        asyncio.run(service.dispatch("GET", "/generate", {"tenant": "long", "length": "200"}))
+
+
+def test_passphrases_in_slices(service):
+    result = asyncio.run(service.dispatch("GET", "/passphrase", {"count": "150"}))
+    assert len(result["passwords"]) == 150
+
+
+def test_batcher_answers_every_request_on_unexpected_errors():
+    def reject(password):
+        raise RuntimeError("store unavailable")
+
+    async def run():
+        batcher = PasswordBatcher(reject)
+        return await asyncio.gather(*(batcher.generate(PasswordPolicy(), 1) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(asyncio.wait_for(run(), 5))
+    assert all(isinstance(r, HTTPError) and r.status == 500 for r in results)
+
+
+def request(path, payload):
+    body = json.dumps(payload).encode()
+    return (f"POST {path} HTTP/1.1\r\nConnection: close\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+def test_unexpected_errors_get_a_500(service, monkeypatch):
+    async def dispatch(method, path, params):
+        raise OSError("word list unreadable")
+
+    monkeypatch.setattr(service, "dispatch", dispatch)
+    status, body = asyncio.run(exchange(service, request("/generate", {})))
+    assert (status, body) == (500, {"error": "word list unreadable"})
+
+
+def test_score_rejects_oversized_passwords(service):
+    status, body = asyncio.run(exchange(service, request("/score", {"password": "x" * (MAX_SCORE_LENGTH + 1)})))
+    assert status == 400
+    status, body = asyncio.run(exchange(service, request("/score", {"password": secrets.token_urlsafe(768)})))
+    assert status == 200 and body["guess_bits"] > 1024
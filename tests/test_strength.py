@@ -0,0 +1,23 @@
+import pytest
+
+from strength import count_words, evaluate_password
+from threat_feed import ThreatSnapshot
+
+
+@pytest.mark.parametrize("password, words", [
+    ("hobnailed&High-speed&Snuffle", 3),
+    ("High-speed&hobnailed&Snuffle", 3),
+    ("Drub7orderliness7self-denying", 3),
+    ("correct-horse-battery-staple", 4),
+    ("Password123!", 1),
+    ("", 0),
+])
+def test_count_words(password, words):
+    assert count_words(password) == words
+
+
+def test_hyphenated_words_do_not_satisfy_min_words():
+    report = evaluate_password("hobnailed&High-speed&Snuffle", ThreatSnapshot(min_words=4), passphrase=True,
+                               word_list_size=10_000)
+    assert report.num_words == 3
+    assert any("1 more words" in suggestion for suggestion in report.suggestions)
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from threat_feed import BreachIndex
+
+NOW = datetime(2026, 3, 10, 12, 30)
+
+
+def breach(i, days_ago, classes, pwn_count, modified="2024-01-01T00:00:00Z"):
+    return {"Name": f"Breach{i}", "BreachDate": (NOW - timedelta(days=days_ago)).strftime("%Y-%m-%d"),
+            "ModifiedDate": modified, "PwnCount": pwn_count, "DataClasses": classes}
+
+
+BREACHES = [breach(0, 0, ["Passwords"], 50_000),
+            breach(1, 0, ["Email addresses", "Passwords"], 120_000),
+            breach(2, 1, ["Email addresses"], 7_000),
+            breach(3, 2, ["Passwords", "Usernames"], 1_000_000),
+            breach(4, 6, ["Email addresses"], 300),
+            breach(5, 30, ["Names"], 42),
+            breach(6, 400, ["Passwords"], 9)]
+
+
+def original_filter(breaches, now, days=1):
+    """The 24-hour filter the GUI used before BreachIndex."""
+    recent = [b for b in breaches if datetime.strptime(b["BreachDate"], "%Y-%m-%d") > now - timedelta(days=days)]
+    return (sum(b["PwnCount"] for b in recent),
+            sum(1 for b in recent if "Passwords" in b["DataClasses"]),
+            sum(1 for b in recent if "Email addresses" in b["DataClasses"]))
+
+
+def test_window_matches_original_filter():
+    index = BreachIndex()
+    index.merge(BREACHES)
+    for now in (NOW, NOW.replace(hour=0, minute=0), NOW.replace(hour=23, minute=59), NOW + timedelta(days=1)):
+        for days in (1, 2, 7, 30, 365):
+            assert index.window(days, now) == original_filter(BREACHES, now, days), (now, days)
+
+
+def test_incremental_merge_matches_rebuild():
+    index = BreachIndex()
+    assert index.merge(BREACHES)
+    assert not index.merge(BREACHES)  # nothing new
+
+    updated = [b for b in BREACHES if b["Name"] != "Breach4"]
+    updated[0] = {**updated[0], "PwnCount": 75_000, "ModifiedDate": "2026-03-10T00:00:00Z"}
+    updated.append(breach(7, 0, ["Passwords"], 10))
+    assert index.merge(updated)
+
+    fresh = BreachIndex()
+    fresh.merge(updated)
+    assert len(index) == len(fresh) == len(updated)
+    for days in (1, 7, 30, 365):
+        assert index.window(days, NOW) == fresh.window(days, NOW) == original_filter(updated, NOW, days)
+
+
+def test_partial_merge_keeps_unlisted_breaches():
+    index = BreachIndex()
+    index.merge(BREACHES)
+    index.merge([breach(8, 0, ["Passwords"], 5)], complete=False)
+    assert len(index) == len(BREACHES) + 1
+
+
+def test_json_round_trip():
+    index = BreachIndex()
+    index.merge(BREACHES)
+    restored = BreachIndex.from_json(index.to_json())
+    for days in (1, 7, 30):
+        assert restored.window(days, NOW) == index.window(days, NOW)
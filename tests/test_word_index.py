@@ -0,0 +1,139 @@
+import os
+import random
+import re
+import string
+
+import pytest
+
+import word_index
+from password_engine import PasswordPolicy, generate_passphrase
+from word_index import OVERFLOW_BIT, SPARSE_RATIO, WordIndex
+
+# 77 letters, so the rarest ones share the overflow bit
+COMMON = string.ascii_lowercase
+RARE = "áéíóúàèìòùâêîôûäëïöüçñßøåæœαβγδεζηθικλμνξοπρστυφχψω"
+
+
+def make_words(count=3_000, seed=1):
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(COMMON) if rng.random() < 0.9 else rng.choice(RARE)
+                          for _ in range(rng.randint(3, 8))))
+    return sorted(words)
+
+
+WORDS = make_words()
+
+
+def brute_force(exclude):
+    return [word for word in WORDS if not set(word) & set(exclude)]
+
+
+@pytest.fixture
+def index():
+    return WordIndex(WORDS)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def counting_path(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(word_index, "optional_import", lambda name: None)
+    return request.param
+
+
+def exclusions(index):
+    unmapped = sorted(index.characters - set(index.char_bits))
+    mapped = sorted(index.char_bits)
+    assert unmapped and any(mask >> OVERFLOW_BIT for mask in index.masks)
+    return ["", "e", "xyz", mapped[-1], unmapped[0], "".join(unmapped[:3]), "e" + unmapped[-1],
+            "Q#7", "aeiou" + "".join(unmapped), string.ascii_lowercase[:20]]
+
+
+def test_pool_size_and_filtered_match_brute_force(index, counting_path):
+    for exclude in exclusions(index):
+        expected = brute_force(exclude)
+        assert index.pool_size(exclude) == len(expected), exclude
+        assert list(index.filtered(exclude)) == expected, exclude
+        assert index.pool_size(exclude) == len(expected)  # now answered from the filtered cache
+
+
+def test_sample_draws_distinct_allowed_words(index):
+    rng = random.Random(2)
+    for exclude in exclusions(index):
+        allowed = set(brute_force(exclude))
+        for _ in range(50):
+            k = min(4, len(allowed))
+            words = index.sample(exclude, k, rng.randrange)
+            assert len(set(words)) == k and set(words) <= allowed, exclude
+
+
+def test_sparse_exclusions_sample_from_the_filtered_list(index):
+    rng = random.Random(3)
+    dense, sparse = "e", string.ascii_lowercase[:20]
+    assert len(brute_force(sparse)) * SPARSE_RATIO < len(WORDS) <= len(brute_force(dense)) * SPARSE_RATIO
+    index.sample(dense, 3, rng.randrange)
+    assert frozenset(dense) not in index._filtered
+    assert set(index.sample(sparse, 3, rng.randrange)) <= set(brute_force(sparse))
+    assert frozenset(sparse) in index._filtered
+
+
+def test_not_enough_words(index):
+    exclude = string.ascii_lowercase + RARE[:-1]
+    with pytest.raises(ValueError, match="Not enough words"):
+        index.sample(exclude, len(brute_force(exclude)) + 1, random.Random(4).randrange)
+
+
+def test_accept_vetoes_candidates_per_slot(index):
+    rng = random.Random(5)
+    for _ in range(100):
+        words = index.sample("q", 3, rng.randrange, lambda slot, word: slot != 1 or word.startswith("s"))
+        assert words[1].startswith("s") and not any("q" in word for word in words)
+
+
+def test_capitalised_slots_respect_uppercase_exclusions(index):
+    policy = PasswordPolicy(length=12, min_words=4, exclude="ABCDEFGHIJKLMNOPQRSTUVWXY")
+    for _ in range(200):
+        passphrase = generate_passphrase(policy, index)
+        assert not set(passphrase) & set(policy.exclude)
+        words = re.split(r"[\d!@#$%^&*-]", passphrase)
+        assert len(words) == 4 and sum(word[0].isupper() for word in words) == 2
+
+
+def write_list(path, words):
+    path.write_text("".join(f"{word}\n" for word in words), encoding="utf-8")
+    return str(path)
+
+
+def test_cache_is_reused_until_the_source_changes(tmp_path):
+    source = write_list(tmp_path / "words.txt", WORDS)
+    words = word_index.open_word_list(source)
+    assert isinstance(words, word_index.MappedWordList) and list(words) == WORDS
+    built = os.stat(f"{source}.idx").st_mtime_ns
+    assert list(word_index.open_word_list(source)) == WORDS
+    assert os.stat(f"{source}.idx").st_mtime_ns == built
+
+    write_list(tmp_path / "words.txt", WORDS + ["zzzz"])  # size changes
+    assert list(word_index.open_word_list(source)) == WORDS + ["zzzz"]
+
+    write_list(tmp_path / "words.txt", WORDS[:-1] + ["yyyy"])  # same size, new mtime
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    words = word_index.open_word_list(source)
+    assert list(words) == WORDS[:-1] + ["yyyy"]
+    assert WordIndex(words).pool_size("y") == sum(1 for word in words if "y" not in word)  # masks rebuilt too
+
+
+def test_corrupt_cache_is_rebuilt(tmp_path):
+    source = write_list(tmp_path / "words.txt", WORDS)
+    (tmp_path / "words.txt.idx").write_bytes(b"not a cache")
+    assert list(word_index.open_word_list(source)) == WORDS
+
+
+def test_unwritable_cache_falls_back_to_memory(tmp_path):
+    source = write_list(tmp_path / "words.txt", WORDS)
+    words = word_index.open_word_list(source, cache_path=str(tmp_path / "missing" / "words.idx"))
+    assert words == WORDS
+    assert WordIndex(words).pool_size("e") == len(brute_force("e"))
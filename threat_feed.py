@@ -0,0 +1,269 @@
+"""Background HIBP breach feed and the threat policy derived from it.
+
+ThreatFeed keeps the latest ThreatSnapshot in memory and refreshes it from
+threat_cache.json or the HIBP breaches API on a daemon thread, so callers
+never block on disk or network I/O. A new snapshot replaces the old one in a
+single assignment; until a refresh succeeds the previous (possibly stale)
+snapshot keeps being served.
+
+Fetched breaches are held in a BreachIndex rather than as raw JSON: per-day
+aggregates sorted by breach date make any look-back window a bisect.
+"""
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+
+import metrics
+
+HIBP_BREACHES_URL = "https://haveibeenpwned.com/api/v3/breaches"
+
+
+@dataclass(frozen=True)
+class ThreatSnapshot:
+    level: str = "Low"
+    trend: str = "Stable"
+    min_length: int = 12
+    min_symbols: int = 0
+    min_words: int = 3
+    context: str = "Checking threats..."
+    fetched_at: float = 0.0  # time.time() of the breach data, 0 if there is none yet
+    error: str = ""
+
+
+class BreachIndex:
+    """HIBP breaches keyed by Name with per-day aggregates sorted by BreachDate.
+
+    DataClasses are stored as bitmasks (bit numbers in data_class_bits), and
+    prefix sums over the sorted days turn any trailing window into a bisect
+    plus two subtractions.
+    """
+
+    def __init__(self):
+        self.data_class_bits = {}
+        self.breaches = {}  # Name -> (ModifiedDate, breach day ordinal, PwnCount, DataClasses mask)
+        self._aggregates = ([], [0], [0], [0])  # days, then prefix sums of accounts, password and email leaks
+
+    def __len__(self):
+        return len(self.breaches)
+
+    def data_class_mask(self, data_classes):
+        mask = 0
+        for name in data_classes:
+            bit = self.data_class_bits.setdefault(name, len(self.data_class_bits))
+            mask |= 1 << bit
+        return mask
+
+    def merge(self, breaches, complete=True):
+        """Merge HIBP breach records, reparsing only new or modified ones.
+
+        With complete=True the records are the whole catalogue, so breaches
+        no longer listed are dropped. Returns True if anything changed.
+        """
+        changed = False
+        seen = set()
+        for b in breaches:
+            name = b["Name"]
+            modified = b.get("ModifiedDate", "")
+            seen.add(name)
+            current = self.breaches.get(name)
+            if current is not None and current[0] == modified:
+                continue
+            day = datetime.strptime(b["BreachDate"], "%Y-%m-%d").toordinal()
+            self.breaches[name] = (modified, day, b["PwnCount"], self.data_class_mask(b["DataClasses"]))
+            changed = True
+        if complete:
+            for name in self.breaches.keys() - seen:
+                del self.breaches[name]
+                changed = True
+        if changed:
+            self._rebuild()
+        return changed
+
+    def _rebuild(self):
+        password_bit = 1 << self.data_class_bits.setdefault("Passwords", len(self.data_class_bits))
+        email_bit = 1 << self.data_class_bits.setdefault("Email addresses", len(self.data_class_bits))
+        per_day = {}
+        for _, day, pwn_count, mask in self.breaches.values():
+            accounts, passwords, emails = per_day.get(day, (0, 0, 0))
+            per_day[day] = (accounts + pwn_count,
+                            passwords + (1 if mask & password_bit else 0),
+                            emails + (1 if mask & email_bit else 0))
+        days = sorted(per_day)
+        accounts, passwords, emails = [0], [0], [0]
+        for day in days:
+            day_accounts, day_passwords, day_emails = per_day[day]
+            accounts.append(accounts[-1] + day_accounts)
+            passwords.append(passwords[-1] + day_passwords)
+            emails.append(emails[-1] + day_emails)
+        self._aggregates = (days, accounts, passwords, emails)  # swapped in one assignment for readers
+
+    def window(self, days=1, now=None):
+        """(total accounts, password breaches, email breaches) dated within the last `days` days."""
+        cutoff = (now or datetime.now()) - timedelta(days=days)
+        # A breach dated d (midnight) is inside the window exactly when d is after the cutoff's date
+        breach_days, accounts, passwords, emails = self._aggregates
+        start = bisect_right(breach_days, cutoff.date().toordinal())
+        return (accounts[-1] - accounts[start], passwords[-1] - passwords[start],
+                emails[-1] - emails[start])
+
+    def to_json(self):
+        classes = sorted(self.data_class_bits, key=self.data_class_bits.get)
+        return {"data_classes": classes,
+                "breaches": [[name, *record] for name, record in self.breaches.items()]}
+
+    @classmethod
+    def from_json(cls, data):
+        index = cls()
+        index.data_class_bits = {name: bit for bit, name in enumerate(data["data_classes"])}
+        index.breaches = {name: (modified, day, pwn_count, mask)
+                          for name, modified, day, pwn_count, mask in data["breaches"]}
+        index._rebuild()
+        return index
+
+
+def assess_threat(index, now=None):
+    """Turn the last 24 hours of a BreachIndex into threat-adaptive password minimums."""
+    total_accounts, password_breaches, email_breaches = index.window(1, now)
+
+    # Refined threat logic with logarithmic scaling
+    if password_breaches >= 2 and total_accounts > 100_000:  # Multiple password leaks today
+        return ThreatSnapshot(
+            level="High", trend="Urgent Password Leaks",
+            min_length=min(32, 12 + int(math.log10(max(1, total_accounts)) * 3)),  # Log scale: 100K=15, 1M=18, 10M=21
+            min_symbols=3, min_words=6,
+            context=f"Urgent: {password_breaches} password leaks today ({total_accounts:,} accounts). Use long, complex passwords.")
+    elif email_breaches > 0 and password_breaches > 0:  # Phishing risk
+        return ThreatSnapshot(
+            level="Medium", trend="Email/Password Exposure",
+            min_length=min(32, 12 + int(math.log10(max(1, total_accounts)) * 2)),  # Log scale: 100K=14, 1M=16, 10M=18
+            min_symbols=2, min_words=4,
+            context=f"Today’s leaks include emails and passwords ({total_accounts:,} accounts). Add variety.")
+    elif total_accounts > 10_000:  # Minor breaches, brute force risk
+        return ThreatSnapshot(
+            level="Medium", trend="Minor Breach Activity",
+            min_length=min(32, 12 + int(math.log10(max(1, total_accounts)) * 1.5)),  # Log scale: 10K=13, 100K=15, 1M=16
+            min_symbols=1, min_words=4,
+            context=f"Minor breaches today ({total_accounts:,} accounts). Slightly longer passwords advised.")
+    return ThreatSnapshot(context="No significant breaches in the last 24 hours. 12+ chars sufficient.")
+
+
+class ThreatFeed:
+    def __init__(self, cache_file="threat_cache.json", max_age=300, timeout=10,
+                 backoff=30, max_backoff=1800, url=HIBP_BREACHES_URL):
+        self.cache_file = cache_file
+        self.max_age = max_age  # 5 minutes keeps us well under HIBP's rate limit
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.url = url
+        self.snapshot = ThreatSnapshot()
+        self.index = BreachIndex()
+        self.fetched_at = 0.0
+        self._cache_mtime = None
+        self._failures = 0
+        self._next_refresh = 0.0
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        """Start refreshing in the background; returns immediately."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ThreatFeed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def is_stale(self):
+        return time.time() - self.snapshot.fetched_at >= self.max_age
+
+    def request_refresh(self):
+        """Ask the background thread to revalidate now if the snapshot is stale.
+
+        Requests made while a failed fetch is backing off are ignored.
+        """
+        if self.is_stale() and time.time() >= self._next_refresh:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stopped:
+            delay = self.refresh()
+            self._next_refresh = time.time() + delay
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def refresh(self):
+        """Bring the index up to date and publish a new snapshot; returns seconds until the next refresh."""
+        self.load_cached_data()
+        try:
+            if time.time() - self.fetched_at >= self.max_age:
+                metrics.count("threat_cache_misses")
+                self.index.merge(self.fetch_threat_data())
+                self.fetched_at = time.time()
+                self.save_cache()
+            else:
+                metrics.count("threat_cache_hits")
+            self.snapshot = replace(assess_threat(self.index), fetched_at=self.fetched_at)
+            self._failures = 0
+            return max(1.0, self.max_age - (time.time() - self.fetched_at))
+        except Exception as e:
+            self._failures += 1
+            # Stale-while-revalidate: keep serving the last good policy, or the expired cache
+            if self.snapshot.fetched_at:
+                self.snapshot = replace(self.snapshot, error=str(e))
+            elif self.fetched_at:
+                self.snapshot = replace(assess_threat(self.index), fetched_at=self.fetched_at, error=str(e))
+            else:
+                self.snapshot = ThreatSnapshot(context=f"Threat data fetch failed: {str(e)}. Using defaults.",
+                                               error=str(e))
+            return min(self.max_backoff, self.backoff * 2 ** (self._failures - 1))
+
+    def window(self, days):
+        """Breach totals over an arbitrary trailing window, e.g. 7 or 30 days."""
+        return self.index.window(days)
+
+    def load_cached_data(self):
+        """Load the cache file into the index if it changed on disk since the last load."""
+        try:
+            mtime = os.stat(self.cache_file).st_mtime_ns
+            if mtime == self._cache_mtime:
+                return
+            with metrics.timer("threat_cache_load"):
+                with open(self.cache_file, 'r') as f:
+                    cache = json.load(f)
+                fetched_at = datetime.fromisoformat(cache["timestamp"]).timestamp()
+                if "data" in cache:  # raw breach list written by older versions
+                    index = BreachIndex()
+                    index.merge(cache["data"])
+                else:
+                    index = BreachIndex.from_json(cache["index"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        self._cache_mtime = mtime
+        if fetched_at > self.fetched_at:
+            self.index, self.fetched_at = index, fetched_at
+
+    def save_cache(self):
+        partial = f"{self.cache_file}.tmp"
+        with open(partial, 'w') as f:
+            json.dump({"timestamp": datetime.fromtimestamp(self.fetched_at).isoformat(),
+                       "index": self.index.to_json()}, f)
+        os.replace(partial, self.cache_file)
+        self._cache_mtime = os.stat(self.cache_file).st_mtime_ns
+
+    @metrics.timed("threat_fetch")
+    def fetch_threat_data(self):
+        """Fetch the full breach catalogue from HIBP."""
+        import requests  # imported here, off the start-up path; only the refresh thread needs it
+
+        response = requests.get(self.url, headers={"User-Agent": "PasswordGenerator"}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
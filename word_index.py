@@ -0,0 +1,336 @@
+"""Character bitmask index over a word list.
+
+Each word is summarised by a bitmask of the characters it contains, so
+filtering the list against a set of excluded characters is a single AND per
+word. Passphrase words are drawn straight from the index by rejection
+sampling against those masks, so a request touches only the words it draws;
+the number of words left after exclusions is counted once per exclusion set
+and cached for entropy estimates. Only when exclusions leave a small fraction
+of the list are the surviving positions materialised, in a small LRU cache.
+
+Word lists can also be opened through a compact on-disk cache (see
+open_word_list) that is memory-mapped instead of read into Python strings,
+and several named lists (e.g. one per language) can be registered in a
+WordLists collection that opens each on first use.
+"""
+import mmap
+import os
+import struct
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+
+import metrics
+from optional import optional_import
+
+OVERFLOW_BIT = 63  # shared by every character beyond the first 63 distinct ones
+
+# Cache layout: header, masks (uint64 per word), offsets (uint32, count + 1),
+# every distinct character ranked by frequency (the first 63 own a mask bit
+# each), then every word back to back.
+CACHE_MAGIC = b"APGWIDX2"
+CACHE_HEADER = struct.Struct("<8sQQII")  # magic, source size, source mtime_ns, count, alphabet bytes
+
+# Rejection sampling is used while at least 1 word in SPARSE_RATIO survives the exclusions
+SPARSE_RATIO = 16
+MAX_CONSECUTIVE_REJECTIONS = 10_000
+
+
+def _char_bits(ranked):
+    return {c: 1 << i for i, c in enumerate(ranked[:OVERFLOW_BIT])}
+
+
+def compute_masks(words):
+    """Rank the characters by frequency and return (ranked, masks); the first 63 get their own bit."""
+    counts = {}
+    for word in words:
+        for c in set(word):
+            counts[c] = counts.get(c, 0) + 1
+    ranked = ''.join(sorted(counts, key=lambda c: (-counts[c], c)))
+    char_bits = _char_bits(ranked)
+
+    overflow = 1 << OVERFLOW_BIT
+    masks = array('Q')
+    for word in words:
+        mask = 0
+        for c in set(word):
+            mask |= char_bits.get(c, overflow)
+        masks.append(mask)
+    return ranked, masks
+
+
+def build_word_list_cache(source, target):
+    """Compile a newline separated word list into the memory-mappable format."""
+    stat = os.stat(source)
+    with open(source, 'r', encoding='utf-8') as file:
+        words = [line.strip() for line in file if line.strip()]
+    if not words:
+        raise ValueError("Word list is empty")
+
+    ranked, masks = compute_masks(words)
+    alphabet = ranked.encode('utf-8')
+    offsets = array('I', [0])
+    encoded = [word.encode('utf-8') for word in words]
+    for word in encoded:
+        offsets.append(offsets[-1] + len(word))
+
+    partial = f"{target}.{os.getpid()}.tmp"
+    with open(partial, 'wb') as file:
+        file.write(CACHE_HEADER.pack(CACHE_MAGIC, stat.st_size, stat.st_mtime_ns, len(words), len(alphabet)))
+        file.write(masks.tobytes())
+        file.write(offsets.tobytes())
+        file.write(alphabet)
+        file.write(b''.join(encoded))
+    os.replace(partial, target)  # readers never see a half-written cache
+
+
+class MappedWordList(Sequence):
+    """Read-only word list served straight from a memory-mapped cache file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.source_size, self.source_mtime_ns, count, alphabet_len = CACHE_HEADER.unpack_from(self._map)
+        if magic != CACHE_MAGIC:
+            raise ValueError(f"'{path}' is not a word list cache")
+
+        view = memoryview(self._map)
+        pos = CACHE_HEADER.size
+        self.masks = view[pos:pos + 8 * count].cast('Q')
+        pos += 8 * count
+        self._offsets = view[pos:pos + 4 * (count + 1)].cast('I')
+        pos += 4 * (count + 1)
+        self.characters = bytes(view[pos:pos + alphabet_len]).decode('utf-8')
+        self._blob = pos + alphabet_len
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("word index out of range")
+        start = self._blob + self._offsets[i]
+        return self._map[start:self._blob + self._offsets[i + 1]].decode('utf-8')
+
+
+@metrics.timed("word_list_load")
+def open_word_list(filename, cache_path=None):
+    """Open filename through its memory-mapped cache, rebuilding it when stale.
+
+    The cache lives next to the source as "<filename>.idx" unless cache_path
+    is given, and is rebuilt whenever the source's size or mtime changes. If
+    the cache cannot be written the words are read into memory instead.
+    """
+    cache_path = cache_path or f"{filename}.idx"
+    stat = os.stat(filename)
+    try:
+        words = MappedWordList(cache_path)
+        if (words.source_size, words.source_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            return words
+    except (OSError, ValueError, struct.error):
+        pass
+
+    try:
+        build_word_list_cache(filename, cache_path)
+    except OSError:
+        with open(filename, 'r', encoding='utf-8') as file:
+            words = [line.strip() for line in file if line.strip()]
+        if not words:
+            raise ValueError("Word list is empty")
+        return words
+    return MappedWordList(cache_path)
+
+
+class _FilteredWords(Sequence):
+    """Words of a list selected by position, without copying the strings."""
+
+    def __init__(self, words, positions):
+        self._words = words
+        self._positions = positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._words[p] for p in self._positions[i]]
+        return self._words[self._positions[i]]
+
+
+class WordIndex:
+    def __init__(self, words, cache_size=32):
+        self.words = words
+        self.cache_size = cache_size
+        self._filtered = OrderedDict()
+        self._pool_sizes = OrderedDict()
+
+        if isinstance(words, MappedWordList):
+            # Masks were computed when the cache file was built
+            characters, self.masks = words.characters, words.masks
+        else:
+            characters, self.masks = compute_masks(words)
+        self.char_bits = _char_bits(characters)
+        self.characters = frozenset(characters)
+
+    def __len__(self):
+        return len(self.words)
+
+    def exclusion_mask(self, exclude):
+        """Mask of excluded characters plus the unmapped ones needing a direct check.
+
+        Characters that appear in no word are dropped, since they exclude nothing.
+        """
+        mask = 0
+        unmapped = set()
+        for c in exclude:
+            bit = self.char_bits.get(c)
+            if bit is not None:
+                mask |= bit
+            elif c in self.characters:
+                unmapped.add(c)
+        return mask, unmapped
+
+    def _excluded(self, i, mask, unmapped):
+        word_mask = self.masks[i]
+        if word_mask & mask:
+            return True
+        # Unmapped characters share the overflow bit, so those words need a real check
+        return bool(unmapped and word_mask >> OVERFLOW_BIT and not unmapped.isdisjoint(self.words[i]))
+
+    def pool_size(self, exclude):
+        """Number of words containing none of the excluded characters (cached)."""
+        key = frozenset(exclude)
+        size = self._pool_sizes.get(key)
+        if size is not None:
+            self._pool_sizes.move_to_end(key)
+            return size
+
+        mask, unmapped = self.exclusion_mask(key)
+        np = optional_import("numpy")  # pool sizes are counted in pure Python without it
+        if key in self._filtered:
+            size = len(self._filtered[key])
+        elif not mask and not unmapped:
+            size = len(self.words)
+        elif not unmapped and np is not None:
+            size = int(np.count_nonzero((np.frombuffer(self.masks, dtype=np.uint64) & np.uint64(mask)) == 0))
+        elif not unmapped:
+            size = sum(1 for word_mask in self.masks if not word_mask & mask)
+        elif np is not None:
+            # Only words clear of the mapped exclusions but using overflow characters need a real check
+            masks = np.frombuffer(self.masks, dtype=np.uint64)
+            clear = (masks & np.uint64(mask)) == 0
+            overflow = (masks >> np.uint64(OVERFLOW_BIT)) != 0
+            words = self.words
+            size = int(np.count_nonzero(clear & ~overflow)) + sum(
+                1 for i in np.flatnonzero(clear & overflow).tolist() if unmapped.isdisjoint(words[i]))
+        else:
+            size = sum(1 for i in range(len(self.words)) if not self._excluded(i, mask, unmapped))
+
+        self._pool_sizes[key] = size
+        if len(self._pool_sizes) > self.cache_size:
+            self._pool_sizes.popitem(last=False)
+        return size
+
+    def sample(self, exclude, k, randbelow, accept=None):
+        """k distinct words containing none of the excluded characters.
+
+        Positions are drawn with randbelow(n) and rejected in place, so no
+        filtered copy of the list is made unless the exclusions leave fewer
+        than 1 word in SPARSE_RATIO. accept(slot, word), if given, may veto a
+        candidate for the slot-th word (e.g. one whose capitalised form would
+        contain an excluded character).
+        """
+        key = frozenset(exclude)
+        pool = self.pool_size(key)
+        if pool < k:
+            raise ValueError("Not enough words available after exclusions")
+
+        if pool * SPARSE_RATIO < len(self.words):
+            words, check = self.filtered(key), None
+        else:
+            words, check = self.words, self.exclusion_mask(key)
+        n = len(words)
+        chosen = set()
+        result = []
+        rejections = 0
+        while len(result) < k:
+            i = randbelow(n)
+            if i not in chosen and not (check and self._excluded(i, *check)):
+                word = words[i]
+                if accept is None or accept(len(result), word):
+                    chosen.add(i)
+                    result.append(word)
+                    rejections = 0
+                    continue
+            rejections += 1
+            if rejections >= MAX_CONSECUTIVE_REJECTIONS:
+                raise ValueError("Not enough words available after exclusions")
+        return result
+
+    def filtered(self, exclude):
+        """Words that contain none of the excluded characters (cached)."""
+        key = frozenset(exclude)
+        cached = self._filtered.get(key)
+        if cached is not None:
+            self._filtered.move_to_end(key)
+            return cached
+
+        mask, unmapped = self.exclusion_mask(key)
+        if not mask and not unmapped:
+            valid = self.words
+        elif not unmapped:
+            valid = _FilteredWords(self.words, array('I', (i for i, word_mask in enumerate(self.masks)
+                                                            if not word_mask & mask)))
+        else:
+            valid = _FilteredWords(self.words, array('I', (i for i in range(len(self.words))
+                                                           if not self._excluded(i, mask, unmapped))))
+
+        self._filtered[key] = valid
+        if len(self._filtered) > self.cache_size:
+            self._filtered.popitem(last=False)
+        return valid
+
+
+class WordLists:
+    """Named word lists, e.g. one per language, each opened and indexed on first use."""
+
+    def __init__(self, sources=None):
+        self.sources = dict(sources or {})
+        self._indexes = {}
+
+    def __contains__(self, name):
+        return name in self.sources
+
+    def names(self):
+        return list(self.sources)
+
+    def add(self, name, filename):
+        self.sources[name] = filename
+        self._indexes.pop(name, None)
+
+    def get(self, name):
+        """WordIndex for the named list; raises ValueError for unknown names."""
+        index = self._indexes.get(name)
+        if index is None:
+            if name not in self.sources:
+                raise ValueError(f"Unknown word list '{name}'; choose from {', '.join(self.sources)}")
+            index = self._indexes[name] = WordIndex(open_word_list(self.sources[name]))
+        return index
+
+
+def discover_word_lists(default="wordlist.txt", directory="wordlists"):
+    """WordLists with the default list as "default" plus every <name>.txt in directory."""
+    lists = WordLists()
+    if os.path.exists(default):
+        lists.add("default", default)
+    if os.path.isdir(directory):
+        for filename in sorted(os.listdir(directory)):
+            name, ext = os.path.splitext(filename)
+            if ext == ".txt":
+                lists.add(name, os.path.join(directory, filename))
+    return lists